@@ -2,8 +2,12 @@ import streamlit as st
 import matplotlib.pyplot as plt
 import pandas as pd
 
+from core.perf import stage
+from perf_panel import begin_page, finish_page
+
 # Configure page
 st.set_page_config(layout="wide", page_title="Employee Attrition Analysis")
+begin_page("Intro")
 
 # Main Title
 st.title("Soft Set Approach for Conflict Analysis and Predictive Analysis")
@@ -27,7 +31,8 @@ st.write("The following conflict flow graph illustrates the relationships and co
 
 # Placeholder for the conflict flow graph
 conflict_graph_path = "images/conflict_graph.png" 
-st.image(conflict_graph_path, caption="Conflict Flow Graph")
+with stage("conflict_graph_image"):
+    st.image(conflict_graph_path, caption="Conflict Flow Graph")
 
 # Section: Models and Results
 st.markdown("## 📊 Models and Results")
@@ -47,20 +52,23 @@ st.dataframe(results_df)
 
 # Visualize Results
 st.markdown("### Performance Comparison")
-fig, ax = plt.subplots(figsize=(10, 6))
-results_df.set_index("Model").plot(kind="bar", ax=ax)
-plt.title("Model Performance Metrics")
-plt.ylabel("Score")
-plt.xlabel("Model")
-plt.xticks(rotation=45)
-plt.tight_layout()
+with stage("performance_chart"):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    results_df.set_index("Model").plot(kind="bar", ax=ax)
+    plt.title("Model Performance Metrics")
+    plt.ylabel("Score")
+    plt.xlabel("Model")
+    plt.xticks(rotation=45)
+    plt.tight_layout()
 
-# Show the chart in Streamlit
-st.pyplot(fig)
+    # Show the chart in Streamlit
+    st.pyplot(fig)
 
 # Section: About the Author
 st.markdown("## 👤 About the Author")
 st.expander("""
 Hi, I’m Kong Yan Hao, a third-year Computer Science student at UM with a keen interest 
 in **Data Science** and **Soft Set Theory Applications**.
-""")
\ No newline at end of file
+""")
+
+finish_page()
@@ -0,0 +1 @@
+"""Shared, UI-independent building blocks used by the Streamlit pages."""
@@ -0,0 +1,253 @@
+"""Process-wide store of the datasets and artifacts shared by every session.
+
+Entries are keyed by content (e.g. ``("dataset", <sha256>)``) so that twenty
+sessions uploading the same file share one copy. Sessions do not keep the
+values themselves: they keep an ``ArtifactRef`` and resolve it on every
+rerun. References are counted, and a reference is released when the session
+drops it (it is garbage-collected with the session state).
+
+The store keeps its resident size under a memory budget
+(``ATTRITION_STORE_BUDGET_MB``, 1024 MiB by default), in least recently
+used order:
+
+* entries no session refers to are evicted; they are reloaded from their
+  on-disk copy on the next access;
+* when only referenced entries are left and spilling is enabled
+  (``ATTRITION_STORE_SPILL=1``), DataFrames are spilled to memory-mapped
+  files: their numeric and categorical columns are written as ``.npy``
+  files under the cache directory and mapped back read-only, so their pages
+  belong to the OS page cache instead of the process heap.
+
+``stats`` reports the resident and spilled sizes, the references and the
+hit rate of the store.
+"""
+import os
+import shutil
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BUDGET_BYTES = int(float(os.environ.get("ATTRITION_STORE_BUDGET_MB", 1024)) * 2 ** 20)
+
+SPILL_ENABLED = os.environ.get("ATTRITION_STORE_SPILL", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def size_of(value):
+    """Return the approximate in-memory size of ``value`` in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, (bytes, bytearray, np.ndarray)):
+        return value.nbytes if isinstance(value, np.ndarray) else len(value)
+    return 0
+
+
+def spill_frame(data, directory):
+    """Write the columns of ``data`` to ``directory`` and return a copy backed by memory-mapped files.
+
+    Numeric columns and the codes of categorical columns are memory-mapped;
+    other columns (e.g. free text) stay in memory. Returns ``(frame,
+    resident bytes)``.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    columns = {}
+    resident = 0
+    for j, column in enumerate(data.columns):
+        values = data[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = _map_array(values.cat.codes.to_numpy(), directory / f"{j}.npy")
+            columns[column] = pd.Categorical.from_codes(codes, dtype=values.dtype)
+        elif isinstance(values.dtype, np.dtype) and values.dtype.kind in "biuf":
+            columns[column] = _map_array(values.to_numpy(), directory / f"{j}.npy")
+        else:
+            columns[column] = values.to_numpy()
+            resident += int(values.memory_usage(index=False, deep=True))
+    frame = pd.DataFrame(columns, index=data.index, copy=False)
+    frame.columns = data.columns
+    return frame, resident + int(data.index.memory_usage(deep=True))
+
+
+def _map_array(array, path):
+    mapped = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+    mapped[:] = array
+    mapped.flush()
+    del mapped
+    return np.load(path, mmap_mode="r")
+
+
+class _Entry:
+    __slots__ = ("value", "size", "spilled_size", "refs", "spill_dir")
+
+    def __init__(self, value, size):
+        self.value = value
+        self.size = size
+        self.spilled_size = 0
+        self.refs = 0
+        self.spill_dir = None
+
+
+class ArtifactRef:
+    """A session's counted reference to an entry of an ``ArtifactStore``.
+
+    The entry is pinned (never evicted, only spilled) while the reference is
+    alive; ``get`` returns its current value.
+    """
+
+    def __init__(self, store, key, load=None):
+        self.key = key
+        self._store = store
+        self._load = load
+        store._acquire(key)
+        weakref.finalize(self, store._release, key)
+
+    def get(self):
+        return self._store.get(self.key, self._load)
+
+
+class ArtifactStore:
+    """An LRU store of shared values under a memory budget (see the module docstring)."""
+
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_BYTES, spill_dir=None):
+        self.budget_bytes = budget_bytes
+        self.spill_dir = Path(spill_dir) if spill_dir is not None else None
+        self._entries = OrderedDict()
+        # References are counted by key, so that they survive an eviction
+        self._refs = {}
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "spills": 0}
+
+    def get(self, key, load=None):
+        """Return the value stored under ``key``.
+
+        On a miss, the value is loaded with ``load`` (a callable returning the
+        value or ``None``) and stored; returns ``None`` without it.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry.value
+            self._counters["misses"] += 1
+
+        if load is None:
+            return None
+        value = load()
+        if value is None:
+            return None
+        return self.put(key, value)
+
+    def put(self, key, value):
+        """Store ``value`` under ``key`` and return the stored value.
+
+        When another thread stored the key meanwhile, its value is kept and
+        returned instead, so every session shares a single copy.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(value, size_of(value))
+                entry.refs = self._refs.get(key, 0)
+            self._entries.move_to_end(key)
+            # The value just stored is in use: never evict it right away
+            self._enforce_budget(keep=key)
+            return entry.value
+
+    def reference(self, key, load=None):
+        """Return an ``ArtifactRef`` to ``key``, which reloads it with ``load`` after an eviction."""
+        return ArtifactRef(self, key, load)
+
+    def _acquire(self, key):
+        with self._lock:
+            self._refs[key] = self._refs.get(key, 0) + 1
+            if key in self._entries:
+                self._entries[key].refs += 1
+
+    def _release(self, key):
+        with self._lock:
+            self._refs[key] -= 1
+            if not self._refs[key]:
+                del self._refs[key]
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.refs -= 1
+            self._enforce_budget()
+
+    def _enforce_budget(self, keep=None):
+        resident = sum(entry.size for entry in self._entries.values())
+        # Every unreferenced entry is evicted before any referenced one is spilled
+        for key, entry in list(self._entries.items()):
+            if resident <= self.budget_bytes:
+                return
+            if entry.refs == 0 and key != keep:
+                self._drop(key)
+                self._counters["evictions"] += 1
+                resident -= entry.size
+        if self.spill_dir is None:
+            return
+        for entry in list(self._entries.values()):
+            if resident <= self.budget_bytes:
+                return
+            if entry.spill_dir is None and isinstance(entry.value, pd.DataFrame):
+                size = entry.size
+                self._spill(entry)
+                resident -= size - entry.size
+
+    def _spill(self, entry):
+        entry.spill_dir = self.spill_dir / uuid.uuid4().hex
+        total = entry.size
+        entry.value, entry.size = spill_frame(entry.value, entry.spill_dir)
+        entry.spilled_size = max(total - entry.size, 0)
+        self._counters["spills"] += 1
+
+    def _drop(self, key):
+        entry = self._entries.pop(key)
+        if entry.spill_dir is not None:
+            # Frames still in use keep their mappings open after the unlink
+            shutil.rmtree(entry.spill_dir, ignore_errors=True)
+
+    def clear(self):
+        """Drop every unreferenced entry."""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.refs == 0]:
+                self._drop(key)
+
+    def stats(self):
+        """Return the entries, references, sizes and hit rate of the store, as a dict."""
+        with self._lock:
+            entries = list(self._entries.values())
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                "entries": len(entries),
+                "referenced_entries": sum(entry.refs > 0 for entry in entries),
+                "references": sum(self._refs.values()),
+                "resident_bytes": sum(entry.size for entry in entries),
+                "spilled_entries": sum(entry.spill_dir is not None for entry in entries),
+                "spilled_bytes": sum(entry.spilled_size for entry in entries),
+                "budget_bytes": self.budget_bytes,
+                **self._counters,
+                "hit_rate": self._counters["hits"] / lookups if lookups else None
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Return the process-wide store, created on first use."""
+    global _store
+    if _store is None:
+        from core.datasets import CACHE_DIR
+
+        with _store_lock:
+            if _store is None:
+                _store = ArtifactStore(spill_dir=CACHE_DIR / "spill" / str(os.getpid()) if SPILL_ENABLED else None)
+    return _store
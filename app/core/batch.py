@@ -0,0 +1,158 @@
+"""Batch scoring helpers shared by the Batch Prediction page.
+
+Features go through the shared pipeline of ``core.features``: the models are
+fed one C-contiguous float32 matrix in the canonical column order.
+
+Besides the in-memory path, ``score_csv_in_chunks`` scores a CSV of any size
+by reading, preprocessing and predicting fixed-size chunks and appending the
+results to an output file, so peak memory is bounded by the chunk size rather
+than the file size. Its output files live under the cache directory (see
+``OutputFile``): they are removed when the session that produced them ends,
+and leftovers (e.g. after a crash) are pruned by age and total size.
+
+Both paths can also explain the predictions: with ``top_k`` set, the
+``top_k`` features that weigh the most on each prediction are added as
+driver columns (see ``core.explanations``).
+"""
+import os
+import tempfile
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from core.datasets import CACHE_DIR, prune_cache
+from core.features import FEATURE_COLUMNS, feature_matrix, model_predict, model_predict_proba, validate_schema
+from core.perf import timed
+
+# Columns the input file must contain
+REQUIRED_COLUMNS = ["EmployeeNumber"] + FEATURE_COLUMNS
+
+RESULT_COLUMNS = ["EmployeeNumber", "Predicted_Attrition"]
+
+# Rows per chunk in streaming mode
+DEFAULT_CHUNK_SIZE = 100_000
+
+# Streaming outputs, with their disk budget and lifetime
+OUTPUTS_DIR = CACHE_DIR / "batch"
+OUTPUTS_MAX_BYTES = int(float(os.environ.get("ATTRITION_BATCH_OUTPUTS_MB", 20_480)) * 2 ** 20)
+OUTPUTS_MAX_AGE_SECONDS = float(os.environ.get("ATTRITION_BATCH_OUTPUTS_MAX_AGE_HOURS", 24)) * 3_600
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class OutputFile:
+    """A streaming output file under ``OUTPUTS_DIR``, removed once its owner drops it.
+
+    Pages keep it in the session state, so the file is removed when the
+    session ends (its state is garbage-collected) or when it is replaced.
+    Creating one first prunes the outputs older than
+    ``OUTPUTS_MAX_AGE_SECONDS`` or beyond ``OUTPUTS_MAX_BYTES``.
+    """
+
+    def __init__(self, suffix=".csv"):
+        prune_cache(OUTPUTS_DIR, OUTPUTS_MAX_BYTES, OUTPUTS_MAX_AGE_SECONDS)
+        OUTPUTS_DIR.mkdir(parents=True, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix="attrition_", suffix=suffix, dir=OUTPUTS_DIR)
+        os.close(fd)
+        self._finalizer = weakref.finalize(self, _remove_file, self.path)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def remove(self):
+        self._finalizer()
+
+
+def preprocess_batch(data):
+    """Validate ``data`` and split it into employee numbers and the model feature matrix."""
+    # Ensure required columns are present
+    validate_schema(data.columns, REQUIRED_COLUMNS)
+
+    # Keep EmployeeNumber separate for final output
+    employee_numbers = data['EmployeeNumber']
+
+    # Features as one float32 matrix, leaving the caller's (possibly shared)
+    # frame untouched
+    return employee_numbers, feature_matrix(data, validate=False)
+
+
+@timed("predict")
+def predict(model, features):
+    """Return the raw class predictions of ``model`` for the feature matrix ``features``."""
+    return model_predict(model, features)
+
+
+@timed("predict_proba")
+def predict_proba(model, features):
+    """Return the probability of attrition predicted by ``model`` for the feature matrix ``features``."""
+    return model_predict_proba(model, features)
+
+
+def to_labels(predictions):
+    """Map class predictions to "Yes"/"No" labels."""
+    return np.where(np.asarray(predictions) == 1, "Yes", "No")
+
+
+def result_columns(top_k=0):
+    """Return the columns of the results, with ``top_k`` drivers."""
+    if not top_k:
+        return list(RESULT_COLUMNS)
+    from core.explanations import driver_columns
+
+    return RESULT_COLUMNS + driver_columns(top_k)
+
+
+def score_frame(model, data, top_k=0, compiled_model=None):
+    """Score an in-memory batch and return the results DataFrame.
+
+    With ``top_k``, the ``top_k`` strongest drivers of every prediction are
+    added; models other than XGBoost then need their ``compiled_model``.
+    """
+    employee_numbers, features = preprocess_batch(data)
+    results = pd.DataFrame({
+        "EmployeeNumber": employee_numbers,
+        "Predicted_Attrition": to_labels(predict(model, features))
+    })
+    if top_k:
+        from core.explanations import feature_contributions, top_drivers
+
+        drivers = top_drivers(feature_contributions(model, features, compiled_model), top_k)
+        drivers.index = results.index
+        results = pd.concat([results, drivers], axis=1)
+    return results
+
+
+def score_csv_in_chunks(source, model, output, chunksize=DEFAULT_CHUNK_SIZE, total_bytes=None, progress=None,
+                        top_k=0, compiled_model=None):
+    """Score the CSV ``source`` chunk by chunk and append the results to ``output``.
+
+    ``source`` is a path or a binary file object and ``output`` a path. Only
+    the required columns are parsed. When given, ``progress`` is called after
+    every chunk with the number of rows scored so far and the fraction of
+    ``total_bytes`` consumed (``None`` when the size is unknown). ``top_k``
+    and ``compiled_model`` are passed to ``score_frame``.
+
+    Returns the total number of rows scored.
+    """
+    rows = 0
+    reader = pd.read_csv(source, chunksize=chunksize, usecols=lambda col: col in REQUIRED_COLUMNS)
+    with reader, open(output, "w", newline="") as out:
+        # Always write the header, so an empty input still yields a valid file
+        out.write(",".join(result_columns(top_k)) + "\n")
+        for chunk in reader:
+            if chunk.empty:
+                continue
+            score_frame(model, chunk, top_k, compiled_model).to_csv(out, index=False, header=False)
+            rows += len(chunk)
+            if progress is not None:
+                fraction = None
+                if total_bytes and hasattr(source, "tell"):
+                    fraction = min(source.tell() / total_bytes, 1.0)
+                progress(rows, fraction)
+    return rows
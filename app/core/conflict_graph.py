@@ -0,0 +1,334 @@
+"""Conflict graph construction and rendering for the Conflict Analysis page.
+
+Graphs are rendered to in-memory PNG images and cached, keyed by a hash of
+the conflict summary and the rendering parameters, so unchanged inputs skip
+both the networkx layout and the matplotlib rendering, and concurrent
+sessions never share a file on disk. networkx and matplotlib are only imported
+once a graph is actually built or rendered.
+
+``threshold_structure`` precomputes, in one pass over a summary, the opinion
+of every attribute at every distinct certainty breakpoint, so the graph for
+any certainty threshold is rebuilt from it without recomputing the analysis.
+
+``render_pairwise_graph`` draws the row-level alliance and conflict edges of
+``core.pairwise_conflicts``. It skips networkx altogether: nodes are placed
+on a circle with NumPy and every kind of edge is drawn as one matplotlib
+``LineCollection``, so it stays fast with hundreds of attributes.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict, namedtuple
+from itertools import combinations, product
+
+import numpy as np
+import pandas as pd
+
+from core.perf import stage
+
+# Attributes whose opinions have a lower certainty are left out of the graph
+DEFAULT_CERTAINTY_THRESHOLD = 0.39
+
+# Number of rendered graphs kept in memory
+MAX_CACHED_GRAPHS = 32
+
+# Number of threshold structures kept in memory
+MAX_CACHED_STRUCTURES = 16
+
+# Opinions in summary order; an attribute's graph opinion is the first of
+# them whose certainty passes the threshold
+GRAPH_OPINIONS = ['-', '0', '+']
+
+# ``codes`` of a ThresholdStructure index into this: 0 means left out
+_CODE_LABELS = np.array([None] + GRAPH_OPINIONS, dtype=object)
+
+# Node labels are only drawn up to this many attributes
+MAX_LABELLED_NODES = 60
+
+ThresholdStructure = namedtuple(
+    "ThresholdStructure", ["digest", "attributes", "breakpoints", "codes", "edge_counts"]
+)
+
+_render_cache = OrderedDict()
+_render_lock = threading.Lock()
+_structures = OrderedDict()
+
+
+def graph_opinions(summary, threshold=DEFAULT_CERTAINTY_THRESHOLD):
+    """Return the opinion of every attribute with a certainty of at least ``threshold``."""
+    filtered_data = summary[summary['Certainty'] >= threshold]
+    return filtered_data.groupby('Attribute')['Opinion'].agg(lambda x: x.value_counts().idxmax())
+
+
+def build_conflict_graph(summary, threshold=DEFAULT_CERTAINTY_THRESHOLD):
+    """Build the conflict graph of a conflict summary.
+
+    Attributes sharing a positive or a negative opinion are joined by
+    "dotted" alliance edges, attributes with opposite opinions by "solid"
+    conflict edges.
+    """
+    return conflict_graph_from_opinions(graph_opinions(summary, threshold))
+
+
+def conflict_graph_from_opinions(opinions):
+    """Build the conflict graph of ``opinions``, a Series of opinions indexed by attribute."""
+    import networkx as nx
+
+    # Group attributes by their opinions
+    positive_attributes = opinions[opinions == "+"].index.tolist()
+    negative_attributes = opinions[opinions == "-"].index.tolist()
+
+    # Initialize the graph
+    G = nx.Graph()
+
+    # Add nodes for all attributes
+    for attribute in opinions.index:
+        G.add_node(attribute, size=2000, color='skyblue')
+
+    # Add alliance edges (dotted lines) for attributes with the same opinion (++ or --)
+    for group in (positive_attributes, negative_attributes):
+        G.add_edges_from(combinations(group, 2), style="dotted")
+
+    # Add conflict edges (solid lines) for attributes with different opinions (+- or -+)
+    G.add_edges_from(product(positive_attributes, negative_attributes), style="solid")
+
+    return G
+
+
+def draw_conflict_graph(G, title, figsize=(10, 10)):
+    """Render the conflict graph ``G`` and return it as PNG bytes."""
+    import networkx as nx
+    from matplotlib.figure import Figure
+
+    # Layout for nodes
+    with stage("graph_layout"):
+        pos = nx.circular_layout(G)
+
+    # A standalone figure, so concurrent sessions do not share pyplot state
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+
+    # Draw nodes
+    nx.draw_networkx_nodes(
+        G, pos,
+        node_size=[2000 for _ in G.nodes()],  # Uniform node size
+        node_color=['skyblue' for _ in G.nodes()],  # Uniform node color
+        ax=ax
+    )
+
+    # Separate edges by type
+    solid_edges = [(u, v) for u, v, attr in G.edges(data=True) if attr["style"] == "solid"]
+    dotted_edges = [(u, v) for u, v, attr in G.edges(data=True) if attr["style"] == "dotted"]
+
+    # Draw edges
+    nx.draw_networkx_edges(G, pos, edgelist=solid_edges, style="solid", edge_color="red", width=2, ax=ax)
+    nx.draw_networkx_edges(G, pos, edgelist=dotted_edges, style="dotted", edge_color="green", width=2, ax=ax)
+
+    # Add labels to nodes
+    nx.draw_networkx_labels(G, pos, font_size=12, font_color="black", ax=ax)
+
+    # Set the title and hide axes
+    ax.set_title(title, fontsize=16)
+    ax.axis("off")
+
+    buffer = io.BytesIO()
+    with stage("graph_render"):
+        fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def summary_digest(summary):
+    """Return a content hash of a conflict summary."""
+    row_hashes = pd.util.hash_pandas_object(summary, index=False).to_numpy()
+    digest = hashlib.sha256(row_hashes.tobytes())
+    digest.update(repr(list(summary.columns)).encode())
+    return digest.hexdigest()
+
+
+def _cached_render(key, render):
+    with _render_lock:
+        image = _render_cache.get(key)
+        if image is not None:
+            _render_cache.move_to_end(key)
+            return image
+
+    image = render()
+    with _render_lock:
+        _render_cache[key] = image
+        while len(_render_cache) > MAX_CACHED_GRAPHS:
+            _render_cache.popitem(last=False)
+    return image
+
+
+def render_conflict_graph(summary, title, threshold=DEFAULT_CERTAINTY_THRESHOLD, figsize=(10, 10)):
+    """Return the conflict graph of ``summary`` as PNG bytes, rendering it only once."""
+    key = (summary_digest(summary), title, threshold, tuple(figsize))
+    return _cached_render(
+        key, lambda: draw_conflict_graph(build_conflict_graph(summary, threshold), title, figsize)
+    )
+
+
+def threshold_structure(summary):
+    """Precompute the graph opinions of a conflict summary at every certainty breakpoint.
+
+    ``breakpoints`` are the distinct certainties in increasing order. Row
+    ``k`` of ``codes`` holds the opinion code of every attribute (0 when left
+    out, else 1 + its index in ``GRAPH_OPINIONS``) for any threshold in
+    ``(breakpoints[k - 1], breakpoints[k]]``; the extra last row, for
+    thresholds above every certainty, leaves every attribute out.
+    ``edge_counts`` holds the matching number of attributes, alliance edges
+    and conflict edges.
+    """
+    attributes = sorted(summary['Attribute'].unique())
+    attribute_index = pd.Index(attributes).get_indexer(summary['Attribute'])
+    opinion_index = pd.Index(GRAPH_OPINIONS).get_indexer(summary['Opinion'])
+
+    # Certainty of every (attribute, opinion), NaN when the opinion never occurs
+    certainty = np.full((len(attributes), len(GRAPH_OPINIONS)), np.nan)
+    certainty[attribute_index, opinion_index] = summary['Certainty'].to_numpy(dtype=np.float64)
+
+    breakpoints = np.unique(certainty[~np.isnan(certainty)])
+    passes = certainty[None, :, :] >= breakpoints[:, None, None]
+    codes = np.where(passes.any(axis=2), passes.argmax(axis=2) + 1, 0).astype(np.int8)
+    codes = np.vstack([codes, np.zeros((1, len(attributes)), dtype=np.int8)])
+
+    positive = (codes == 1 + GRAPH_OPINIONS.index('+')).sum(axis=1)
+    negative = (codes == 1 + GRAPH_OPINIONS.index('-')).sum(axis=1)
+    edge_counts = pd.DataFrame({
+        'Threshold': np.r_[breakpoints, np.inf],
+        'Attributes': (codes > 0).sum(axis=1),
+        'Alliances': positive * (positive - 1) // 2 + negative * (negative - 1) // 2,
+        'Conflicts': positive * negative
+    })
+    return ThresholdStructure(summary_digest(summary), attributes, breakpoints, codes, edge_counts)
+
+
+def cached_threshold_structure(summary):
+    """Return the threshold structure of ``summary``, computing it once per summary content."""
+    digest = summary_digest(summary)
+    with _render_lock:
+        structure = _structures.get(digest)
+        if structure is not None:
+            _structures.move_to_end(digest)
+            return structure
+
+    structure = threshold_structure(summary)
+    with _render_lock:
+        _structures[digest] = structure
+        while len(_structures) > MAX_CACHED_STRUCTURES:
+            _structures.popitem(last=False)
+    return structure
+
+
+def breakpoint_index(structure, threshold):
+    """Return the row of ``structure.codes`` that applies to ``threshold``."""
+    return int(np.searchsorted(structure.breakpoints, threshold, side='left'))
+
+
+def opinions_at(structure, threshold):
+    """Return the graph opinions at ``threshold``, like ``graph_opinions`` but from ``structure``."""
+    codes = structure.codes[breakpoint_index(structure, threshold)]
+    shown = np.flatnonzero(codes)
+    return pd.Series(
+        _CODE_LABELS[codes[shown]], index=pd.Index(np.array(structure.attributes, dtype=object)[shown],
+                                                   name='Attribute'),
+        name='Opinion'
+    )
+
+
+def breakpoint_title(structure, index):
+    """Return the title of the conflict graph at the breakpoint ``index`` of ``structure``."""
+    if index < len(structure.breakpoints):
+        return f"Conflict Graph (certainty >= {structure.breakpoints[index]:.2f})"
+    if len(structure.breakpoints):
+        return f"Conflict Graph (certainty > {structure.breakpoints[-1]:.2f})"
+    return "Conflict Graph"
+
+
+def render_conflict_graph_at(structure, threshold, figsize=(10, 10)):
+    """Return the conflict graph at ``threshold`` as PNG bytes, from a precomputed structure.
+
+    Thresholds between the same two breakpoints draw the same graph, titled
+    after the breakpoint, and share one cached rendering.
+    """
+    index = breakpoint_index(structure, threshold)
+    key = (structure.digest, "breakpoint", index, tuple(figsize))
+    return _cached_render(
+        key, lambda: draw_conflict_graph(conflict_graph_from_opinions(opinions_at(structure, threshold)),
+                                         breakpoint_title(structure, index), figsize)
+    )
+
+
+def circular_positions(n_nodes):
+    """Return the ``(n_nodes, 2)`` positions of nodes evenly spaced on the unit circle."""
+    angles = 2 * np.pi * np.arange(n_nodes) / max(n_nodes, 1)
+    return np.column_stack([np.cos(angles), np.sin(angles)])
+
+
+def draw_pairwise_graph(attributes, edges, title, figsize=(10, 10)):
+    """Render the pairwise alliance/conflict ``edges`` between ``attributes`` and return PNG bytes.
+
+    ``edges`` is an edge list from ``pairwise_edges``; the opacity of every
+    edge grows with its degree.
+    """
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import to_rgba
+    from matplotlib.figure import Figure
+
+    with stage("graph_layout"):
+        pos = circular_positions(len(attributes))
+
+    fig = Figure(figsize=figsize)
+    ax = fig.subplots()
+
+    max_degree = edges['Degree'].max() if len(edges) else 1.0
+    for relation, color, linestyle in (('Conflict', 'red', 'solid'), ('Alliance', 'green', 'dotted')):
+        selected = edges[edges['Relation'] == relation]
+        if selected.empty:
+            continue
+        segments = np.stack([pos[selected['Source'].to_numpy()], pos[selected['Target'].to_numpy()]], axis=1)
+        alpha = 0.15 + 0.85 * selected['Degree'].to_numpy() / max_degree
+        colors = np.tile(to_rgba(color), (len(selected), 1))
+        colors[:, 3] = alpha
+        ax.add_collection(LineCollection(segments, colors=colors, linestyles=linestyle, linewidths=1.5,
+                                         label=relation))
+
+    # Smaller nodes as the graph grows
+    node_size = max(20, 2000 // max(len(attributes) // 10, 1))
+    ax.scatter(pos[:, 0], pos[:, 1], s=node_size, c='skyblue', zorder=2)
+    if len(attributes) <= MAX_LABELLED_NODES:
+        for (x, y), attribute in zip(pos, attributes):
+            ax.text(x, y, attribute, fontsize=12 if len(attributes) <= 20 else 8,
+                    ha='center', va='center', zorder=3)
+
+    ax.set_title(title, fontsize=16)
+    ax.set_xlim(-1.2, 1.2)
+    ax.set_ylim(-1.2, 1.2)
+    ax.set_aspect('equal')
+    ax.axis("off")
+    if len(edges):
+        ax.legend(loc="upper right")
+
+    buffer = io.BytesIO()
+    with stage("graph_render"):
+        fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def counts_digest(counts):
+    """Return a content hash of ``PairwiseCounts``."""
+    digest = hashlib.sha256(repr((counts.attributes, counts.n_rows)).encode())
+    digest.update(np.ascontiguousarray(counts.alliances).tobytes())
+    digest.update(np.ascontiguousarray(counts.conflicts).tobytes())
+    return digest.hexdigest()
+
+
+def render_pairwise_graph(counts, title, threshold, max_edges, figsize=(10, 10)):
+    """Return the pairwise graph of ``counts`` above ``threshold`` as PNG bytes, rendering it only once."""
+    from core.pairwise_conflicts import pairwise_edges
+
+    key = (counts_digest(counts), "pairwise", threshold, max_edges, title, tuple(figsize))
+    return _cached_render(
+        key, lambda: draw_pairwise_graph(counts.attributes, pairwise_edges(counts, threshold, max_edges),
+                                         title, figsize)
+    )
@@ -0,0 +1,230 @@
+"""Dataset ingestion shared by the exploration, conflict and batch pages.
+
+An uploaded CSV is parsed once per distinct content: it is identified by the
+SHA-256 of its bytes, its columns are downcast to compact dtypes and the
+result is stored as Parquet under the cache directory, together with the
+quantile sketches of its 'balanced' attributes. Later uploads of the same
+content, in any session, are served from the in-process store or from the
+Parquet file instead of being parsed again.
+
+Parsed datasets live in the process-wide ``core.artifact_store``, where
+every session uploading the same content shares one copy. Sessions keep a
+``dataset_ref`` rather than the DataFrame, so the store can evict or spill
+datasets to stay within its memory budget.
+
+The on-disk caches are bounded too: ``prune_cache`` removes their least
+recently used entries beyond a size budget (``ATTRITION_DATASETS_CACHE_MB``,
+2048 MiB by default, for the datasets) and entries unused for more than
+``ATTRITION_CACHE_MAX_AGE_DAYS`` days (7 by default).
+"""
+import hashlib
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from core.artifact_store import get_store
+from core.perf import stage
+from core.quantiles import QuantileSketch, sketch_columns
+from core.soft_set import MAPPING_RULES, balanced_attributes
+
+# Root of every on-disk cache, overridable through the environment
+CACHE_DIR = Path(os.environ.get("ATTRITION_CACHE_DIR", Path(__file__).resolve().parents[2] / ".cache"))
+DATASETS_DIR = CACHE_DIR / "datasets"
+
+DATASETS_MAX_BYTES = int(float(os.environ.get("ATTRITION_DATASETS_CACHE_MB", 2048)) * 2 ** 20)
+
+# Cache entries unused for longer than this are removed
+CACHE_MAX_AGE_SECONDS = float(os.environ.get("ATTRITION_CACHE_MAX_AGE_DAYS", 7)) * 86_400
+
+# Object columns with at most this share of distinct values become categoricals
+CATEGORICAL_MAX_RATIO = 0.5
+
+
+def content_hash(source, block_size=1 << 20):
+    """Return the SHA-256 hex digest of a file object's content, or of bytes."""
+    digest = hashlib.sha256()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(block_size), b""):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def downcast(data):
+    """Return ``data`` with compact dtypes.
+
+    Integer columns get the smallest integer type holding their values (int8
+    for the 1-4 survey scales, int16 for income and age), and low-cardinality
+    text columns such as the Yes/No fields become categoricals. Float columns
+    are left untouched so that quantiles are not affected.
+    """
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        if pd.api.types.is_integer_dtype(values):
+            values = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            if values.nunique(dropna=True) <= CATEGORICAL_MAX_RATIO * len(values):
+                values = values.astype("category")
+        columns[column] = values
+    return pd.DataFrame(columns, index=data.index)
+
+
+def _entry_size(path):
+    if path.is_file():
+        return path.stat().st_size
+    return sum(child.stat().st_size for child in path.rglob("*") if child.is_file())
+
+
+def touch(path):
+    """Mark the cache entry ``path`` as just used."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_cache(directory, max_bytes, max_age=CACHE_MAX_AGE_SECONDS, keep=()):
+    """Remove the entries of the cache ``directory`` that are too old or beyond its size budget.
+
+    Entries are the files and subdirectories of ``directory``; their
+    modification time (see ``touch``) is their last use. Entries unused for
+    more than ``max_age`` seconds are removed, then the least recently used
+    ones until the entries take at most ``max_bytes``. The entries named in
+    ``keep`` are never removed. Returns the number of bytes freed.
+    """
+    directory = Path(directory)
+    if not directory.is_dir():
+        return 0
+    entries = []
+    for path in directory.iterdir():
+        try:
+            entries.append((path.stat().st_mtime, path, _entry_size(path)))
+        except OSError:
+            # Removed concurrently
+            continue
+    entries.sort(key=lambda entry: entry[0])
+
+    total = sum(size for _, _, size in entries)
+    now = time.time()
+    freed = 0
+    for mtime, path, size in entries:
+        if path.name in keep:
+            continue
+        if total <= max_bytes and now - mtime <= max_age:
+            continue
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            path.unlink(missing_ok=True)
+        total -= size
+        freed += size
+    return freed
+
+
+def dataset_dir(key):
+    return DATASETS_DIR / key
+
+
+def _parquet_path(key):
+    return dataset_dir(key) / "data.parquet"
+
+
+def _sketch_path(key, column):
+    return dataset_dir(key) / "sketches" / f"{column}.sketch"
+
+
+def _write_atomically(path, write):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    write(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _persist(key, data):
+    _write_atomically(_parquet_path(key), lambda path: data.to_parquet(path, index=False))
+
+    # Quantile sketches of the numeric 'balanced' attributes
+    columns = [
+        attr for attr in balanced_attributes(MAPPING_RULES)
+        if attr in data.columns and pd.api.types.is_numeric_dtype(data[attr])
+    ]
+    for column, sketch in sketch_columns(data, columns).items():
+        _write_atomically(_sketch_path(key, column), sketch.save)
+
+
+def _store_key(key):
+    return ("dataset", key)
+
+
+def _load_persisted(key):
+    path = _parquet_path(key)
+    if not path.is_file():
+        return None
+    touch(dataset_dir(key))
+    return pd.read_parquet(path)
+
+
+def get_dataset(key):
+    """Return the dataset stored under ``key``, or ``None`` if it is unknown."""
+    return get_store().get(_store_key(key), lambda: _load_persisted(key))
+
+
+def dataset_ref(key):
+    """Return a counted reference to the dataset ``key``, to be kept in a session's state.
+
+    The dataset stays in the store while the reference is alive; its ``get``
+    returns the DataFrame, reloaded from its Parquet copy if needed.
+    """
+    return get_store().reference(_store_key(key), lambda: _load_persisted(key))
+
+
+def ingest(source, key=None):
+    """Parse the CSV ``source`` unless its content is already cached.
+
+    ``source`` is a binary file object such as a Streamlit upload. Returns
+    ``(key, data)``. The returned DataFrame is shared and must not be
+    modified in place.
+    """
+    if key is None:
+        key = content_hash(source)
+    data = get_dataset(key)
+    if data is None:
+        source.seek(0)
+        with stage("csv_parse"):
+            data = downcast(pd.read_csv(source))
+        with stage("dataset_persist"):
+            _persist(key, data)
+            prune_cache(DATASETS_DIR, DATASETS_MAX_BYTES, keep={key})
+        # Another session may have stored the same content meanwhile
+        data = get_store().put(_store_key(key), data)
+    return key, data
+
+
+def load_upload(uploaded_file, state):
+    """Ingest a Streamlit upload, hashing it only once per upload.
+
+    ``state`` is the session state, used to remember the key of the upload.
+    Returns ``(key, data)``.
+    """
+    cache_key = f"dataset_key_{uploaded_file.file_id}"
+    key, data = ingest(uploaded_file, state.get(cache_key))
+    if cache_key not in state:
+        touch(dataset_dir(key))
+    state[cache_key] = key
+    return key, data
+
+
+def load_sketches(key):
+    """Return the stored quantile sketches of the dataset ``key``, by column."""
+    sketch_dir = dataset_dir(key) / "sketches"
+    if not sketch_dir.is_dir():
+        return {}
+    return {path.stem: QuantileSketch.load(path) for path in sketch_dir.glob("*.sketch")}
@@ -0,0 +1,90 @@
+"""Scores a batch with every registered model at once and combines the results.
+
+The models are scored concurrently in a thread pool: the tree ensembles do
+their heavy lifting in native code that releases the GIL, so the wall-clock
+time is close to that of the slowest model rather than the sum of all of
+them, and the loaded models are shared instead of being copied into worker
+processes.
+"""
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from core.batch import predict_proba, preprocess_batch, to_labels
+from core.model_registry import available_models, get_model
+
+EnsembleResult = namedtuple("EnsembleResult", ["results", "model_stats", "pairwise_agreement", "wall_time"])
+
+
+def _score_model(name, features):
+    start = time.perf_counter()
+    probabilities = predict_proba(get_model(name), features)
+    return probabilities, time.perf_counter() - start
+
+
+def score_models(features, names, max_workers=None):
+    """Score ``features`` with every model in ``names`` concurrently.
+
+    Returns ``{name: (probabilities, seconds)}``. The pool is sized to the
+    number of available cores unless ``max_workers`` is given.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(names)))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ensemble") as pool:
+        futures = {name: pool.submit(_score_model, name, features) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def score_all_models(data, names=None, max_workers=None):
+    """Score the batch ``data`` with every available model and combine the predictions.
+
+    The results contain, per model, the attrition probability and the
+    "Yes"/"No" prediction, followed by a majority-vote and a soft-vote
+    ensemble and the fraction of models that agree with the majority. Ties in
+    the majority vote are broken by the soft vote.
+    """
+    if names is None:
+        names = available_models()
+    if not names:
+        raise ValueError("No model artifacts are available.")
+
+    start = time.perf_counter()
+    employee_numbers, features = preprocess_batch(data)
+    scored = score_models(features, names, max_workers=max_workers)
+
+    probabilities = np.column_stack([scored[name][0] for name in names])
+    # Same decision rule as the classifiers' own predict()
+    votes = probabilities > 0.5
+
+    soft_probability = probabilities.mean(axis=1)
+    soft_vote = soft_probability > 0.5
+    positive_votes = votes.sum(axis=1)
+    majority = np.where(positive_votes * 2 == len(names), soft_vote, positive_votes * 2 > len(names))
+    agrees = votes == majority[:, None]
+
+    columns = {"EmployeeNumber": employee_numbers.to_numpy()}
+    for j, name in enumerate(names):
+        columns[f"{name} Probability"] = probabilities[:, j]
+        columns[f"{name} Prediction"] = to_labels(votes[:, j])
+    columns["Majority Vote"] = to_labels(majority)
+    columns["Soft Vote Probability"] = soft_probability
+    columns["Soft Vote"] = to_labels(soft_vote)
+    columns["Agreement"] = agrees.mean(axis=1)
+    results = pd.DataFrame(columns)
+
+    model_stats = pd.DataFrame({
+        "Model": names,
+        "Predicted Attrition Rate": votes.mean(axis=0),
+        "Agreement with Majority": agrees.mean(axis=0),
+        "Seconds": [scored[name][1] for name in names]
+    })
+
+    pairwise = (votes[:, :, None] == votes[:, None, :]).mean(axis=0)
+    pairwise_agreement = pd.DataFrame(pairwise, index=names, columns=names)
+
+    return EnsembleResult(results, model_stats, pairwise_agreement, time.perf_counter() - start)
@@ -0,0 +1,122 @@
+"""On-demand exports of result tables as CSV, gzip-compressed CSV or Parquet.
+
+Exports are generated only when a download is actually requested (the pages
+pass a callable to ``st.download_button``), and are written chunk by chunk to
+a temporary file on disk: only one chunk is ever serialised in memory, and
+the finished file is read back once. A multi-GB frame therefore never exists
+as one large CSV string next to its encoded copy.
+
+Sources are either a DataFrame, split into chunks of ``DEFAULT_CHUNK_ROWS``
+rows, or an iterable of DataFrame chunks such as a chunked ``read_csv``.
+"""
+import gzip
+import shutil
+import tempfile
+
+import pandas as pd
+
+CSV = "csv"
+CSV_GZIP = "csv.gz"
+PARQUET = "parquet"
+
+# Format -> (label, file extension, MIME type)
+FORMATS = {
+    CSV: ("CSV", ".csv", "text/csv"),
+    CSV_GZIP: ("Compressed CSV (gzip)", ".csv.gz", "application/gzip"),
+    PARQUET: ("Parquet", ".parquet", "application/vnd.apache.parquet")
+}
+
+# Rows serialised at once
+DEFAULT_CHUNK_ROWS = 100_000
+
+# Exports are compressed while the user waits: level 3 is about 2.5 times
+# faster than the default level 6 for an 8% larger file
+GZIP_LEVEL = 3
+
+
+def file_name(stem, fmt):
+    """Return the download file name of ``stem`` in the format ``fmt``."""
+    return stem + FORMATS[fmt][1]
+
+
+def mime_type(fmt):
+    return FORMATS[fmt][2]
+
+
+def iter_chunks(data, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield ``data`` (a DataFrame or an iterable of DataFrames) as DataFrame chunks."""
+    if isinstance(data, pd.DataFrame):
+        if data.empty:
+            yield data
+        for start in range(0, len(data), chunk_rows):
+            yield data.iloc[start:start + chunk_rows]
+    else:
+        yield from data
+
+
+def _write_csv(chunks, out):
+    header = True
+    for chunk in chunks:
+        out.write(chunk.to_csv(index=False, header=header).encode("utf-8"))
+        header = False
+
+
+def _write_parquet(chunks, out):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(out, table.schema)
+            elif table.schema != writer.schema:
+                # Chunks parsed separately may infer narrower types
+                table = table.cast(writer.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_export(data, fmt, out, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write ``data`` in the format ``fmt`` to the binary file object ``out``, chunk by chunk."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt!r}")
+    chunks = iter_chunks(data, chunk_rows)
+    if fmt == CSV:
+        _write_csv(chunks, out)
+    elif fmt == CSV_GZIP:
+        with gzip.GzipFile(fileobj=out, mode="wb", compresslevel=GZIP_LEVEL) as compressed:
+            _write_csv(chunks, compressed)
+    else:
+        _write_parquet(chunks, out)
+
+
+def export_bytes(data, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Return the export of ``data`` in the format ``fmt``, built through a temporary file."""
+    with tempfile.TemporaryFile(prefix="attrition_export_") as out:
+        write_export(data, fmt, out, chunk_rows)
+        out.seek(0)
+        return out.read()
+
+
+def export_csv_file(path, fmt, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Return the export of the CSV file at ``path`` in the format ``fmt``.
+
+    A plain CSV export is the file itself; other formats read it in chunks.
+    """
+    if fmt == CSV:
+        with open(path, "rb") as f:
+            return f.read()
+    if fmt == CSV_GZIP:
+        # No need to parse the file just to compress it
+        with tempfile.TemporaryFile(prefix="attrition_export_") as out:
+            with open(path, "rb") as source, gzip.GzipFile(fileobj=out, mode="wb",
+                                                            compresslevel=GZIP_LEVEL) as compressed:
+                shutil.copyfileobj(source, compressed, 1 << 20)
+            out.seek(0)
+            return out.read()
+    with pd.read_csv(path, chunksize=chunk_rows) as reader:
+        return export_bytes(reader, fmt)
@@ -0,0 +1,127 @@
+"""The feature pipeline shared by every scoring entry point.
+
+Whatever the source (an uploaded batch, the single-employee form, a request
+of the scoring service), the model features go through the same steps:
+
+* the schema is validated once, against ``FEATURE_COLUMNS``;
+* ``OverTime`` is encoded with a vectorized comparison ("Yes" -> 1, anything
+  else -> 0), without touching the caller's data;
+* the columns are written straight into one C-contiguous ``float32`` matrix
+  in the canonical ``FEATURE_COLUMNS`` order.
+
+Both XGBoost and the scikit-learn trees evaluate splits on ``float32``, so
+the matrix is fed to every model as-is: wrapped in an XGBoost ``DMatrix``
+for XGBoost models, and passed directly to the scikit-learn estimators and
+to the compiled ensembles, with no further copy or feature-name check.
+"""
+import numpy as np
+
+# Model features, in the order the models were trained on
+FEATURE_COLUMNS = [
+    "JobSatisfaction", "WorkLifeBalance", "EnvironmentSatisfaction", "RelationshipSatisfaction",
+    "Age", "MonthlyIncome", "YearsAtCompany", "OverTime", "JobInvolvement", "Education", "PerformanceRating"
+]
+
+# Categorical features and the value encoded as 1
+BINARY_FEATURES = {"OverTime": "Yes"}
+
+FEATURE_DTYPE = np.float32
+
+
+def validate_schema(columns, required=FEATURE_COLUMNS):
+    """Raise ``ValueError`` if any of the ``required`` columns is missing from ``columns``."""
+    present = set(columns)
+    missing_cols = [col for col in required if col not in present]
+    if missing_cols:
+        raise ValueError(f"The input file is missing required columns: {missing_cols}")
+
+
+def _encode(values, column):
+    if column in BINARY_FEATURES:
+        return np.asarray(values == BINARY_FEATURES[column])
+    return values
+
+
+def feature_matrix(data, validate=True):
+    """Return the features of the DataFrame ``data`` as a C-contiguous float32 matrix.
+
+    Columns other than ``FEATURE_COLUMNS`` are ignored and ``data`` is left
+    untouched. Missing values become NaN.
+    """
+    if validate:
+        validate_schema(data.columns)
+    matrix = np.empty((len(data), len(FEATURE_COLUMNS)), dtype=FEATURE_DTYPE)
+    for j, column in enumerate(FEATURE_COLUMNS):
+        values = data[column]
+        if column in BINARY_FEATURES:
+            matrix[:, j] = _encode(values.array, column)
+        elif isinstance(values.dtype, np.dtype):
+            # Plain NumPy columns are cast while being copied into the matrix
+            matrix[:, j] = values.to_numpy()
+        else:
+            # Nullable extension columns: pd.NA becomes NaN
+            matrix[:, j] = values.to_numpy(dtype=FEATURE_DTYPE, na_value=np.nan)
+    return matrix
+
+
+def record_features(record):
+    """Return the features of one employee, a mapping of column to value, as a float32 vector."""
+    if not hasattr(record, "keys"):
+        raise ValueError("Each employee must be a mapping of feature names to values.")
+    missing_cols = [col for col in FEATURE_COLUMNS if col not in record]
+    if missing_cols:
+        raise ValueError(f"The employee is missing required fields: {missing_cols}")
+
+    vector = np.empty(len(FEATURE_COLUMNS), dtype=FEATURE_DTYPE)
+    for j, column in enumerate(FEATURE_COLUMNS):
+        value = _encode(record[column], column)
+        try:
+            vector[j] = value
+        except (TypeError, ValueError):
+            raise ValueError(f"Field {column!r} must be numeric, got {value!r}.") from None
+    return vector
+
+
+def as_matrix(features):
+    """Return ``features`` (a vector or a matrix) as a C-contiguous float32 matrix, copying only if needed."""
+    features = np.asarray(features, dtype=FEATURE_DTYPE)
+    if features.ndim == 1:
+        features = features.reshape(1, -1)
+    return np.ascontiguousarray(features)
+
+
+def _is_xgboost(model):
+    return type(model).__module__.startswith("xgboost")
+
+
+def xgboost_iteration_range(booster):
+    """Return the trees of ``booster`` that ``XGBClassifier.predict`` would use."""
+    # Only the trees up to the best iteration when early stopping was used
+    best_iteration = booster.attr("best_iteration")
+    return (0, int(best_iteration) + 1) if best_iteration is not None else (0, 0)
+
+
+def _xgboost_probabilities(model, matrix):
+    from xgboost import DMatrix
+
+    booster = model.get_booster()
+    # The binary:logistic booster returns the probability of the positive class
+    return booster.predict(DMatrix(matrix, nthread=-1), iteration_range=xgboost_iteration_range(booster))
+
+
+def model_predict_proba(model, features):
+    """Return the probability of attrition predicted by ``model`` for a feature matrix."""
+    matrix = as_matrix(features)
+    if _is_xgboost(model):
+        return _xgboost_probabilities(model, matrix)
+    probabilities = model.predict_proba(matrix)
+    return probabilities if probabilities.ndim == 1 else probabilities[:, 1]
+
+
+def model_predict(model, features):
+    """Return the class predictions of ``model`` for a feature matrix."""
+    matrix = as_matrix(features)
+    if _is_xgboost(model):
+        # Same decision rule as XGBClassifier.predict
+        return (_xgboost_probabilities(model, matrix) > 0.5).astype(np.int64)
+    return model.predict(matrix)
@@ -0,0 +1,140 @@
+"""Dynamic micro-batching of single-row scoring requests.
+
+Scoring one row at a time pays the per-call overhead of the model for every
+request. A ``MicroBatcher`` queues the rows submitted by concurrent callers
+and hands them to a single worker thread, which scores them together as soon
+as ``max_batch_size`` rows are waiting or the oldest row has waited
+``max_wait`` seconds, whichever comes first. Each caller gets a
+``concurrent.futures.Future`` resolved with its own row's result.
+
+``LatencyStats`` keeps a window of recent request latencies and batch sizes
+to report throughput and latency percentiles.
+"""
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+DEFAULT_MAX_BATCH_SIZE = 64
+
+# Seconds the first row of a batch may wait for more rows
+DEFAULT_MAX_WAIT = 0.005
+
+# Requests kept to compute the latency percentiles
+STATS_WINDOW = 10_000
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+class LatencyStats:
+    """Thread-safe throughput, latency and batch size statistics."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self.started = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+
+    def record_batch(self, latencies, failed=False):
+        with self._lock:
+            self._latencies.extend(latencies)
+            self._batch_sizes.append(len(latencies))
+            self.requests += len(latencies)
+            self.batches += 1
+            if failed:
+                self.errors += len(latencies)
+
+    def snapshot(self):
+        """Return the statistics as a JSON-serialisable dict; latencies are in milliseconds."""
+        with self._lock:
+            latencies = np.array(self._latencies)
+            batch_sizes = np.array(self._batch_sizes)
+            requests, batches, errors = self.requests, self.batches, self.errors
+        uptime = time.perf_counter() - self.started
+
+        stats = {
+            "uptime_s": uptime,
+            "requests": requests,
+            "batches": batches,
+            "errors": errors,
+            "throughput_rps": requests / uptime if uptime > 0 else 0.0,
+            "mean_batch_size": float(batch_sizes.mean()) if len(batch_sizes) else 0.0,
+            "max_batch_size": int(batch_sizes.max()) if len(batch_sizes) else 0
+        }
+        values = np.percentile(latencies * 1000, PERCENTILES) if len(latencies) else np.zeros(len(PERCENTILES))
+        for p, value in zip(PERCENTILES, values):
+            stats[f"latency_p{p}_ms"] = float(value)
+        return stats
+
+
+class MicroBatcher:
+    """Groups rows submitted concurrently into batches scored by ``score_batch``.
+
+    ``score_batch`` takes a 2-D array with one row per request and returns a
+    sequence with one result per row.
+    """
+
+    def __init__(self, score_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT,
+                 stats=None):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.stats = stats if stats is not None else LatencyStats()
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, row):
+        """Queue ``row`` for scoring and return a future of its result."""
+        future = Future()
+        self._queue.put((np.asarray(row), future, time.perf_counter()))
+        return future
+
+    def close(self):
+        """Stop the worker once the rows already queued are scored."""
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = first[2] + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Put the stop marker back for the main loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            rows, futures, submitted = zip(*batch)
+
+            failed = False
+            try:
+                results = self.score_batch(np.stack(rows))
+            except Exception as e:
+                failed = True
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, result in zip(futures, results):
+                    future.set_result(result)
+
+            done = time.perf_counter()
+            self.stats.record_batch([done - start for start in submitted], failed)
@@ -0,0 +1,136 @@
+"""Process-wide registry of the trained attrition models.
+
+Streamlit re-executes every page script on each widget interaction, so the
+models are not loaded by the pages themselves. They are loaded here, lazily
+on first use, and kept for the lifetime of the process so that every rerun
+and every session shares the same instances.
+"""
+import threading
+from pathlib import Path
+
+from core.perf import timed
+
+# Location of the model artifacts, independent of the working directory
+MODELS_DIR = Path(__file__).resolve().parents[2] / "models"
+
+# Display name -> artifact file name, in the order shown in the UI
+MODEL_FILES = {
+    "XGBoost (Recommended)": "XGBoost.json",
+    "Random Forest": "RandomForest.pkl",
+    # "ADABoost": "ada_clf_model.pkl",
+    "Gradient Boosting": "Gradient_Boosting.pkl"
+}
+
+RECOMMENDED_MODEL = "XGBoost (Recommended)"
+
+_models = {}
+_compiled = {}
+_lock = threading.Lock()
+
+
+class ModelNotAvailableError(FileNotFoundError):
+    """Raised when a registered model has no artifact on disk."""
+
+
+def model_names():
+    """Return the names of all registered models."""
+    return list(MODEL_FILES.keys())
+
+
+def model_path(name):
+    """Return the artifact path of the model registered as ``name``."""
+    if name not in MODEL_FILES:
+        raise KeyError(f"Unknown model: {name!r}")
+    return MODELS_DIR / MODEL_FILES[name]
+
+
+def is_available(name):
+    """Return whether the artifact of ``name`` exists on disk."""
+    return model_path(name).is_file()
+
+
+def available_models():
+    """Return the names of the registered models whose artifact exists."""
+    return [name for name in MODEL_FILES if is_available(name)]
+
+
+@timed("model_load")
+def _load(path):
+    if path.suffix == ".json":
+        from xgboost import XGBClassifier
+
+        model = XGBClassifier()
+        model.load_model(str(path))
+        return model
+
+    from joblib import load
+
+    return load(path)
+
+
+def artifact_fingerprint(name):
+    """Return a fingerprint of the artifact of ``name`` that changes when the file does.
+
+    Raises ``ModelNotAvailableError`` when the artifact is missing.
+    """
+    path = model_path(name)
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise ModelNotAvailableError(
+            f"The artifact for '{name}' was not found at '{path}'."
+        ) from None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def get_model(name):
+    """Return the model registered as ``name``, loading it on first use.
+
+    The model is reloaded when its artifact changes on disk. Raises
+    ``ModelNotAvailableError`` when the artifact is missing.
+    """
+    fingerprint = artifact_fingerprint(name)
+    entry = _models.get(name)
+    if entry is not None and entry[1] == fingerprint:
+        return entry[0]
+
+    with _lock:
+        # Another session may have loaded it while we were waiting
+        entry = _models.get(name)
+        if entry is None or entry[1] != fingerprint:
+            entry = (_load(model_path(name)), fingerprint)
+            _models[name] = entry
+            _compiled.pop(name, None)
+    return entry[0]
+
+
+def get_compiled_model(name):
+    """Return the model registered as ``name`` compiled for low-latency scoring.
+
+    Returns ``None`` when the model type cannot be compiled, in which case the
+    estimator returned by ``get_model`` has to be used instead.
+    """
+    from core.tree_compiler import compile_model
+
+    model = get_model(name)
+    entry = _compiled.get(name)
+    if entry is not None and entry[0] is model:
+        return entry[1]
+
+    with _lock:
+        entry = _compiled.get(name)
+        if entry is None or entry[0] is not model:
+            try:
+                compiled = compile_model(model)
+            except NotImplementedError:
+                compiled = None
+            entry = (model, compiled)
+            _compiled[name] = entry
+    return entry[1]
+
+
+def clear():
+    """Drop every loaded model so that the next access reloads it from disk."""
+    with _lock:
+        _models.clear()
+        _compiled.clear()
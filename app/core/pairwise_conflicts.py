@@ -0,0 +1,108 @@
+"""Row-level pairwise conflict and alliance degrees between soft-set attributes.
+
+Following Pawlak's conflict model, every row of the mapped soft set (an
+``int8`` matrix of ``-1``/``0``/``1`` opinions) is an agent, and two of its
+attributes are:
+
+* allied when they hold the same non-neutral opinion (``++`` or ``--``);
+* in conflict when they hold opposite opinions (``+-`` or ``-+``);
+* neutral to each other when either opinion is ``0``.
+
+The alliance (conflict) degree of two attributes is the share of rows in
+which they are allied (in conflict). All the pairs are counted at once with
+two matrix products per chunk of rows: with ``M`` the opinions and ``|M|``
+their absolute values, ``MᵀM`` holds alliances minus conflicts and
+``|M|ᵀ|M|`` alliances plus conflicts. Chunks are bounded so that the
+``float32`` products are exact, and their counts are accumulated as
+integers, so memory stays at ``O(chunk * n_attributes + n_attributes²)``
+whatever the number of rows.
+
+``pairwise_edges`` turns the degrees into a sparse edge list holding only
+the pairs above a threshold, which is what the graph is drawn from.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Rows per chunk; below 2 ** 24 the float32 products count exactly
+DEFAULT_CHUNK_ROWS = 65_536
+
+# Default minimal degree of the edges kept in the graph
+DEFAULT_DEGREE_THRESHOLD = 0.2
+
+# Largest number of edges kept, strongest first
+MAX_EDGES = 5_000
+
+EDGE_COLUMNS = ['Source', 'Target', 'Relation', 'Degree']
+
+PairwiseCounts = namedtuple("PairwiseCounts", ["attributes", "n_rows", "alliances", "conflicts"])
+
+
+def pairwise_counts(mapped, attributes, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Count the rows in which every pair of attributes of a mapped soft set is allied or in conflict.
+
+    ``mapped`` is an ``(n_rows, n_attributes)`` opinion matrix (or a
+    DataFrame of it). Returns a ``PairwiseCounts`` whose ``alliances`` and
+    ``conflicts`` are symmetric ``(n_attributes, n_attributes)`` ``int64``
+    matrices; their diagonals count the non-neutral opinions of each
+    attribute (an attribute is always allied with itself).
+    """
+    mapped = np.asarray(mapped)
+    n_rows, n_attributes = mapped.shape
+    if not 0 < chunk_rows <= 2 ** 24:
+        raise ValueError(f"chunk_rows must be between 1 and {2 ** 24}, got {chunk_rows}")
+
+    signed = np.zeros((n_attributes, n_attributes), dtype=np.int64)
+    engaged = np.zeros((n_attributes, n_attributes), dtype=np.int64)
+    for start in range(0, n_rows, chunk_rows):
+        chunk = mapped[start:start + chunk_rows].astype(np.float32)
+        # MᵀM = alliances - conflicts, |M|ᵀ|M| = alliances + conflicts
+        signed += np.rint(chunk.T @ chunk).astype(np.int64)
+        np.abs(chunk, out=chunk)
+        engaged += np.rint(chunk.T @ chunk).astype(np.int64)
+
+    return PairwiseCounts(
+        list(attributes), n_rows, (engaged + signed) // 2, (engaged - signed) // 2
+    )
+
+
+def pairwise_degrees(counts):
+    """Return the alliance and conflict degrees of ``counts`` as two attribute-indexed DataFrames."""
+    n_rows = max(counts.n_rows, 1)
+    return (
+        pd.DataFrame(counts.alliances / n_rows, index=counts.attributes, columns=counts.attributes),
+        pd.DataFrame(counts.conflicts / n_rows, index=counts.attributes, columns=counts.attributes)
+    )
+
+
+def pairwise_edges(counts, threshold=DEFAULT_DEGREE_THRESHOLD, max_edges=MAX_EDGES):
+    """Return the alliance and conflict edges with a degree of at least ``threshold``.
+
+    Every unordered pair of distinct attributes gives at most one edge per
+    relation. Only the ``max_edges`` strongest edges are kept. The result is
+    a DataFrame with the ``EDGE_COLUMNS``, sorted by decreasing degree, whose
+    ``Source`` and ``Target`` are positions in ``counts.attributes``.
+    """
+    n_rows = max(counts.n_rows, 1)
+    upper = np.triu_indices(len(counts.attributes), k=1)
+    frames = []
+    for relation, matrix in (('Alliance', counts.alliances), ('Conflict', counts.conflicts)):
+        degree = matrix[upper] / n_rows
+        keep = np.flatnonzero((degree >= threshold) & (degree > 0))
+        frames.append(pd.DataFrame({
+            'Source': upper[0][keep],
+            'Target': upper[1][keep],
+            'Relation': relation,
+            'Degree': degree[keep]
+        }, columns=EDGE_COLUMNS))
+
+    edges = pd.concat(frames, ignore_index=True)
+    order = np.argsort(-edges['Degree'].to_numpy(), kind='stable')[:max_edges]
+    return edges.iloc[order].reset_index(drop=True)
+
+
+def named_edges(counts, edges):
+    """Return ``edges`` with the attribute names in place of their positions."""
+    names = np.array(counts.attributes, dtype=object)
+    return edges.assign(Source=names[edges['Source'].to_numpy()], Target=names[edges['Target'].to_numpy()])
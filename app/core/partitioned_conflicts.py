@@ -0,0 +1,159 @@
+"""Out-of-core conflict analysis of a partitioned dataset.
+
+The organisation-wide history is a directory of CSV and/or Parquet
+partitions (e.g. one per month) that does not fit in memory at once. The
+conflict summary is additive over rows, so it is computed as a two-pass
+map-reduce over the partitions, in a process pool:
+
+1. every partition is reduced to the quantile sketches of its 'balanced'
+   attributes, and the sketches are merged into global thresholds;
+2. every partition is mapped to the soft set with those global thresholds
+   and reduced to per-attribute opinion counts, which are summed.
+
+The summary is then built from the total counts with
+``conflict_summary_from_counts``, exactly as on the Conflict Analysis page,
+with the same ``MAPPING_RULES``. Partitions are read chunk by chunk and only
+the analysed columns are parsed, so a worker's memory is bounded by the chunk
+size. Thresholds are exact while a column has at most
+``core.quantiles.DEFAULT_DISTINCT_LIMIT`` distinct values in total (which
+covers the integer attributes), and t-digest estimates beyond that.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core.quantiles import merge_sketches, sketch_columns
+from core.soft_set import (
+    MAPPING_RULES, SUMMARY_COLUMNS, available_rules, balanced_attributes, compute_stat_values,
+    conflict_summary_from_counts, map_soft_set, opinion_counts
+)
+
+PARTITION_SUFFIXES = (".csv", ".parquet")
+
+# Rows read at once from a partition
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def find_partitions(root):
+    """Return the CSV and Parquet files under ``root`` (a directory or a single file), sorted by path."""
+    root = Path(root)
+    if root.is_file():
+        return [root]
+    partitions = sorted(path for path in root.rglob("*") if path.suffix.lower() in PARTITION_SUFFIXES)
+    if not partitions:
+        raise ValueError(f"No CSV or Parquet partition found under '{root}'.")
+    return partitions
+
+
+def partition_columns(path):
+    """Return the column names of a partition without reading its rows."""
+    path = Path(path)
+    if path.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def read_partition(path, columns, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield the ``columns`` of a partition as DataFrame chunks of at most ``chunk_rows`` rows."""
+    path = Path(path)
+    missing_cols = [col for col in columns if col not in partition_columns(path)]
+    if missing_cols:
+        raise ValueError(f"Partition '{path}' is missing columns: {missing_cols}")
+
+    if path.suffix.lower() == ".parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=list(columns)):
+            yield batch.to_pandas()
+    else:
+        with pd.read_csv(path, usecols=list(columns), chunksize=chunk_rows) as reader:
+            yield from reader
+
+
+def _sketch_partition(path, columns, chunk_rows):
+    return sketch_columns(read_partition(path, columns, chunk_rows), columns)
+
+
+def _count_partition(path, rules, stat_values, chunk_rows):
+    counts = np.zeros((len(rules), 3), dtype=np.int64)
+    for chunk in read_partition(path, list(rules), chunk_rows):
+        counts += opinion_counts(map_soft_set(chunk, rules, stat_values))
+    return counts
+
+
+def partitioned_conflict_summary(root, attributes=None, max_workers=None, chunk_rows=DEFAULT_CHUNK_ROWS,
+                                 progress=None):
+    """Return the conflict summary of every partition under ``root`` together.
+
+    ``attributes`` restricts the analysis, like the attribute selection of the
+    page; by default every attribute of ``MAPPING_RULES`` found in the first
+    partition is analysed, and every partition must have them. ``progress``,
+    when given, is called with a message after every partition of each pass.
+
+    Returns ``(summary, stat_values)``, the latter holding the merged
+    thresholds of the 'balanced' attributes.
+    """
+    partitions = find_partitions(root)
+    columns = partition_columns(partitions[0])
+    if attributes is not None:
+        columns = [col for col in columns if col in set(attributes)]
+    rules = available_rules(columns, MAPPING_RULES)
+    if not rules:
+        raise ValueError("None of the analysed attributes has a mapping rule.")
+    balanced = balanced_attributes(rules)
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(partitions)))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        # Pass 1: global thresholds of the 'balanced' attributes
+        sketch_maps = []
+        futures = [pool.submit(_sketch_partition, path, balanced, chunk_rows) for path in partitions]
+        for done, (path, future) in enumerate(zip(partitions, futures), 1):
+            sketch_maps.append(future.result())
+            if progress is not None:
+                progress(f"Thresholds: {done}/{len(partitions)} partitions ({path.name})")
+        stat_values = compute_stat_values(None, rules, merge_sketches(sketch_maps))
+
+        # Pass 2: opinion counts with the global thresholds
+        counts = np.zeros((len(rules), 3), dtype=np.int64)
+        futures = [pool.submit(_count_partition, path, rules, stat_values, chunk_rows) for path in partitions]
+        for done, (path, future) in enumerate(zip(partitions, futures), 1):
+            counts += future.result()
+            if progress is not None:
+                progress(f"Opinions: {done}/{len(partitions)} partitions ({path.name})")
+
+    return conflict_summary_from_counts(list(rules), counts), stat_values
+
+
+def save_summary(summary, path):
+    """Write a conflict summary to ``path``, as Parquet or CSV depending on its suffix."""
+    path = Path(path)
+    if path.suffix.lower() == ".parquet":
+        summary.to_parquet(path, index=False)
+    else:
+        summary.to_csv(path, index=False)
+
+
+def read_summary(source, name=None):
+    """Read a conflict summary written by ``save_summary``.
+
+    ``source`` is a path or a binary file object such as a Streamlit upload,
+    whose file ``name`` tells Parquet from CSV. Raises ``ValueError`` when the
+    file is not a conflict summary.
+    """
+    name = str(name or source)
+    if name.lower().endswith(".parquet"):
+        summary = pd.read_parquet(source)
+    else:
+        # Keep the '0' opinion a string
+        summary = pd.read_csv(source, dtype={'Attribute': str, 'Opinion': str}, float_precision='round_trip')
+    missing_cols = [col for col in SUMMARY_COLUMNS if col not in summary.columns]
+    if missing_cols:
+        raise ValueError(f"The file is not a conflict summary, it is missing columns: {missing_cols}")
+    return summary[SUMMARY_COLUMNS]
@@ -0,0 +1,207 @@
+"""Lightweight timing and memory instrumentation of the app's hot paths.
+
+Instrumentation is off unless the ``ATTRITION_PERF`` environment variable is
+set when the app starts:
+
+* ``ATTRITION_PERF=1`` records the wall time of every stage and the peak
+  resident memory of the process;
+* ``ATTRITION_PERF=memory`` also traces Python allocations with
+  ``tracemalloc`` to report the peak memory of every stage (much slower).
+
+A page opens a run with ``begin_run`` at the top of the script and closes it
+with ``end_run``; in between, code is measured with the ``stage`` context
+manager or the ``timed`` decorator. Stages nest, and stages entered outside
+of a run (e.g. in a worker thread) are ignored. Every finished run is
+appended as one JSON line to the trace file (``ATTRITION_PERF_TRACE``, by
+default ``.cache/perf/traces.jsonl``), which ``aggregate_traces`` summarises.
+
+When instrumentation is off, ``stage`` returns a shared no-op context
+manager and ``timed`` returns the function unchanged, so the cost is one
+function call per stage, or nothing at all.
+"""
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MODE = os.environ.get("ATTRITION_PERF", "").strip().lower()
+ENABLED = MODE in ("1", "true", "yes", "on", "memory")
+TRACE_MEMORY = MODE == "memory"
+
+_NOOP = contextlib.nullcontext()
+_state = threading.local()
+_trace_lock = threading.Lock()
+
+
+def trace_path():
+    """Return the path of the JSONL trace file."""
+    if "ATTRITION_PERF_TRACE" in os.environ:
+        return Path(os.environ["ATTRITION_PERF_TRACE"])
+    from core.datasets import CACHE_DIR
+    return CACHE_DIR / "perf" / "traces.jsonl"
+
+
+def peak_rss_mb():
+    """Return the peak resident memory of the process in MiB, or ``None`` if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class Run:
+    """The stages measured during one rerun of a page."""
+
+    def __init__(self, page):
+        self.page = page
+        self.run_id = uuid.uuid4().hex
+        self.timestamp = time.time()
+        self.total_ms = None
+        self.stages = []
+        self._start = time.perf_counter()
+        self._stack = []
+
+    def to_record(self):
+        return {
+            "timestamp": self.timestamp,
+            "run_id": self.run_id,
+            "pid": os.getpid(),
+            "page": self.page,
+            "total_ms": self.total_ms,
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages
+        }
+
+
+class _Stage:
+    __slots__ = ("name", "run", "record", "start", "memory_start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.run = getattr(_state, "run", None)
+        if self.run is None:
+            return self
+        stack = self.run._stack
+        self.record = {
+            "name": "/".join([entry.name for entry in stack] + [self.name]),
+            "depth": len(stack),
+            "start_ms": (time.perf_counter() - self.run._start) * 1000
+        }
+        self.run.stages.append(self.record)
+        if TRACE_MEMORY:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # Keep the parent's peak so far before resetting it
+                stack[-1].record.setdefault("_child_peaks", []).append(peak)
+            self.memory_start = current
+            tracemalloc.reset_peak()
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.run is None:
+            return False
+        self.record["ms"] = (time.perf_counter() - self.start) * 1000
+        if exc_type is not None:
+            self.record["error"] = exc_type.__name__
+        if TRACE_MEMORY:
+            peak = tracemalloc.get_traced_memory()[1]
+            # Nested stages reset the peak: take the largest of the children's
+            peak = max([peak] + self.record.pop("_child_peaks", []))
+            self.record["peak_mb"] = (peak - self.memory_start) / 2 ** 20
+        self.run._stack.pop()
+        if TRACE_MEMORY and self.run._stack:
+            self.run._stack[-1].record.setdefault("_child_peaks", []).append(peak)
+        return False
+
+
+def stage(name):
+    """Return a context manager measuring the enclosed code as the stage ``name``."""
+    if not ENABLED:
+        return _NOOP
+    return _Stage(name)
+
+
+def timed(name):
+    """Decorator measuring every call of the function as the stage ``name``."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _Stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def begin_run(page):
+    """Start measuring a rerun of ``page`` on the current thread; returns the run or ``None``."""
+    if not ENABLED:
+        return None
+    if TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _state.run = Run(page)
+    return _state.run
+
+
+def end_run():
+    """Finish the current run, append it to the trace file and return it (``None`` when off)."""
+    run = getattr(_state, "run", None)
+    if run is None:
+        return None
+    _state.run = None
+    run.total_ms = (time.perf_counter() - run._start) * 1000
+
+    path = trace_path()
+    line = json.dumps(run.to_record()) + "\n"
+    with _trace_lock:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+    return run
+
+
+def read_traces(path=None):
+    """Yield the runs recorded in a trace file."""
+    with open(path or trace_path(), encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def aggregate_traces(path=None):
+    """Return per-page, per-stage timing statistics of a trace file as a DataFrame."""
+    import pandas as pd
+
+    rows = []
+    for run in read_traces(path):
+        rows.append({"page": run["page"], "stage": "(total)", "ms": run["total_ms"]})
+        rows.extend({"page": run["page"], "stage": s["name"], "ms": s.get("ms")} for s in run["stages"])
+    if not rows:
+        return pd.DataFrame(columns=["page", "stage", "calls", "mean_ms", "p50_ms", "p95_ms", "max_ms"])
+
+    grouped = pd.DataFrame(rows).dropna(subset=["ms"]).groupby(["page", "stage"])["ms"]
+    return pd.DataFrame({
+        "calls": grouped.size(),
+        "mean_ms": grouped.mean(),
+        "p50_ms": grouped.median(),
+        "p95_ms": grouped.quantile(0.95),
+        "max_ms": grouped.max()
+    }).reset_index()
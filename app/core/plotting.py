@@ -0,0 +1,128 @@
+"""Size-bounded chart data for the Quick Visualizations section.
+
+Above a point budget, charts are drawn from aggregated or downsampled data so
+that the rendering time and the size of the page stay bounded whatever the
+number of rows:
+
+* scatter plots of numeric columns become 2-D histograms (a density image);
+  non-numeric columns are randomly sampled down to the budget,
+* line charts are downsampled with Largest-Triangle-Three-Buckets (LTTB),
+  which keeps the visual shape of the series,
+* bar charts keep the largest bars and fold the rest into an "Other" bar.
+
+Aggregates are cached per dataset hash and column pair, so they are computed
+once for all sessions.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.perf import stage
+
+# Maximum number of points drawn as-is, overridable through the environment
+DEFAULT_POINT_BUDGET = int(os.environ.get("ATTRITION_POINT_BUDGET", 5_000))
+
+# Maximum number of bars in a bar chart
+MAX_BARS = 50
+
+# Bins per axis of the 2-D histogram replacing large scatter plots
+HISTOGRAM_BINS = 100
+
+# Number of aggregates kept in memory
+MAX_CACHED_AGGREGATES = 64
+
+_aggregates = OrderedDict()
+_lock = threading.Lock()
+
+
+def cached_aggregate(key, compute):
+    """Return the aggregate cached under ``key``, calling ``compute()`` on a miss.
+
+    ``key`` must identify the data, e.g. by starting with the dataset hash.
+    """
+    with _lock:
+        if key in _aggregates:
+            _aggregates.move_to_end(key)
+            return _aggregates[key]
+
+    with stage("chart_aggregate"):
+        value = compute()
+    with _lock:
+        _aggregates[key] = value
+        while len(_aggregates) > MAX_CACHED_AGGREGATES:
+            _aggregates.popitem(last=False)
+    return value
+
+
+def lttb(x, y, n_out):
+    """Return the indices of the ``n_out`` points kept by LTTB downsampling.
+
+    ``x`` must be sorted. The first and last points are always kept.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+        else:
+            next_x, next_y = x[-1], y[-1]
+
+        # Keep the point forming the largest triangle with the previously kept
+        # point and the average of the next bucket
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        selected[i + 1] = a
+    return selected
+
+
+def downsample_line(series, budget=DEFAULT_POINT_BUDGET):
+    """Downsample a line series (indexed by x) to at most ``budget`` points."""
+    if len(series) <= budget:
+        return series
+    if pd.api.types.is_numeric_dtype(series.index):
+        x = series.index.to_numpy(dtype=np.float64)
+    else:
+        x = np.arange(len(series), dtype=np.float64)
+    return series.iloc[lttb(x, series.to_numpy(dtype=np.float64), budget)]
+
+
+def limit_bars(series, max_bars=MAX_BARS):
+    """Keep the ``max_bars - 1`` largest bars and sum the others into "Other"."""
+    if len(series) <= max_bars:
+        return series
+    order = np.argsort(-series.to_numpy(dtype=np.float64), kind="stable")
+    kept = series.iloc[np.sort(order[:max_bars - 1])]
+    other = pd.Series([series.iloc[order[max_bars - 1:]].sum()], index=["Other"])
+    return pd.concat([kept.set_axis(kept.index.astype(str)), other])
+
+
+def scatter_histogram(x, y, bins=HISTOGRAM_BINS):
+    """Return ``(counts, x_edges, y_edges)`` of the 2-D histogram of two numeric columns."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    return np.histogram2d(x[finite], y[finite], bins=bins)
+
+
+def sample_points(x, y, budget=DEFAULT_POINT_BUDGET, seed=0):
+    """Return a reproducible random sample of at most ``budget`` (x, y) points."""
+    if len(x) <= budget:
+        return x, y
+    rows = np.sort(np.random.default_rng(seed).choice(len(x), size=budget, replace=False))
+    return x.iloc[rows], y.iloc[rows]
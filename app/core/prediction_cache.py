@@ -0,0 +1,155 @@
+"""Process-wide LRU cache of individual predictions.
+
+Entries are keyed on the model name, the fingerprint of its artifact and the
+exact feature vector, so a model retrained on disk never serves stale
+predictions: the first lookup after the artifact changes drops every entry of
+that model. The cache is shared by all sessions.
+"""
+import itertools
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from core.features import model_predict, model_predict_proba
+from core.model_registry import artifact_fingerprint, get_model
+
+# Maximum number of cached predictions, overridable through the environment
+DEFAULT_CACHE_SIZE = int(os.environ.get("ATTRITION_PREDICTION_CACHE_SIZE", 65_536))
+
+# Rows scored at once when precomputing a grid
+GRID_BATCH_SIZE = 4_096
+
+
+class PredictionCache:
+    """A thread-safe LRU cache of ``(prediction, probability)`` pairs."""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _key(self, model_name, features):
+        # Read from disk outside the lock
+        fingerprint = artifact_fingerprint(model_name)
+        with self._lock:
+            if self._fingerprints.get(model_name) != fingerprint:
+                # The artifact changed on disk: forget every prediction of the old model
+                self._drop_model(model_name)
+                self._fingerprints[model_name] = fingerprint
+        return model_name, fingerprint, tuple(np.asarray(features, dtype=np.float64).ravel().tolist())
+
+    def _drop_model(self, model_name):
+        for key in [key for key in self._entries if key[0] == model_name]:
+            del self._entries[key]
+        self._fingerprints.pop(model_name, None)
+
+    def _evict(self):
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, model_name, features):
+        """Return the cached result for ``features``, or ``None`` on a miss."""
+        key = self._key(model_name, features)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return result
+
+    def put(self, model_name, features, result):
+        """Store ``result`` for ``features``."""
+        key = self._key(model_name, features)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def get_or_compute(self, model_name, features, compute):
+        """Return the cached result for ``features``, calling ``compute()`` on a miss."""
+        result = self.get(model_name, features)
+        if result is None:
+            result = compute()
+            self.put(model_name, features, result)
+        return result
+
+    def put_many(self, model_name, feature_matrix, predictions, probabilities):
+        """Store one result per row of ``feature_matrix``."""
+        fingerprint_key = self._key(model_name, feature_matrix[0])[:2]
+        rows = np.asarray(feature_matrix, dtype=np.float64).tolist()
+        with self._lock:
+            for row, prediction, probability in zip(rows, predictions.tolist(), probabilities.tolist()):
+                key = fingerprint_key + (tuple(row),)
+                self._entries[key] = (prediction, probability)
+                self._entries.move_to_end(key)
+            self._evict()
+
+    def invalidate(self, model_name=None):
+        """Drop the entries of ``model_name``, or every entry when omitted."""
+        with self._lock:
+            if model_name is None:
+                self._entries.clear()
+                self._fingerprints.clear()
+            else:
+                self._drop_model(model_name)
+
+    def stats(self):
+        """Return the hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._entries),
+            "maxsize": self.maxsize
+        }
+
+
+def grid_matrix(base_vector, grid_levels):
+    """Return every combination of ``grid_levels`` applied on top of ``base_vector``.
+
+    ``grid_levels`` maps feature positions to the values they can take; the
+    other features keep the value they have in ``base_vector``.
+    """
+    positions = list(grid_levels.keys())
+    combinations = np.array(list(itertools.product(*grid_levels.values())), dtype=np.float32)
+    matrix = np.repeat(np.asarray(base_vector, dtype=np.float32)[None, :], len(combinations), axis=0)
+    matrix[:, positions] = combinations
+    return matrix
+
+
+def warm_grid(cache, model_name, compiled_model, base_vector, grid_levels):
+    """Precompute and cache the predictions for every point of a feature grid.
+
+    ``compiled_model`` is ``None`` for models that cannot be compiled, which
+    are then scored with their estimator. Returns the number of grid points
+    cached.
+    """
+    if compiled_model is None:
+        model = get_model(model_name)
+    matrix = grid_matrix(base_vector, grid_levels)
+    for start in range(0, len(matrix), GRID_BATCH_SIZE):
+        batch = matrix[start:start + GRID_BATCH_SIZE]
+        if compiled_model is None:
+            predictions = np.asarray(model_predict(model, batch))
+            probabilities = np.asarray(model_predict_proba(model, batch), dtype=np.float64)
+        else:
+            margins = compiled_model.decision_function(batch)
+            probabilities = 1.0 / (1.0 + np.exp(-margins))
+            predictions = compiled_model.classes[(margins > 0).astype(np.intp)]
+        cache.put_many(model_name, batch, predictions, probabilities)
+    return len(matrix)
+
+
+# Shared by every session of the process
+prediction_cache = PredictionCache()
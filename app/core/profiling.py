@@ -0,0 +1,137 @@
+"""Background data profiling with an on-disk report cache.
+
+Profiling reports are generated by a single background worker, so the
+Streamlit session that asked for one stays responsive and can poll its
+progress. Finished reports are written to disk as HTML, keyed by the dataset
+hash, the selected attributes and the profiling mode, so asking again for the
+same report, from any session, returns immediately. The HTML of the reports
+being viewed is shared by every session through ``core.artifact_store``. The
+report cache keeps its least recently used reports within
+``ATTRITION_PROFILES_CACHE_MB`` (512 MiB by default), see
+``core.datasets.prune_cache``.
+
+The "fast" mode profiles a random sample of large frames with ydata's minimal
+settings; the "full" mode profiles every row with the explorative settings.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.artifact_store import get_store
+from core.datasets import CACHE_DIR, prune_cache, touch
+
+REPORTS_DIR = CACHE_DIR / "profiles"
+
+REPORTS_MAX_BYTES = int(float(os.environ.get("ATTRITION_PROFILES_CACHE_MB", 512)) * 2 ** 20)
+
+FAST_MODE = "fast"
+FULL_MODE = "full"
+
+# Rows profiled in fast mode
+FAST_MODE_SAMPLE_ROWS = 50_000
+
+REPORT_TITLE = "Pandas Profiling Report"
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+# Unknown to this process, or pruned from the cache: to be requested again
+EXPIRED = "expired"
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiling")
+_jobs = {}
+_lock = threading.Lock()
+
+
+def report_key(data_key, attributes, mode):
+    """Return the cache key of a report."""
+    payload = json.dumps([data_key, list(attributes), mode, FAST_MODE_SAMPLE_ROWS])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def report_path(key):
+    return REPORTS_DIR / f"{key}.html"
+
+
+def _set_status(key, state, progress, message, error=None):
+    with _lock:
+        _jobs[key] = {"state": state, "progress": progress, "message": message, "error": error,
+                      "started": _jobs.get(key, {}).get("started", time.time())}
+
+
+def _generate(key, data, mode):
+    try:
+        # Inside the try, so that a missing or broken install fails the job
+        from ydata_profiling import ProfileReport
+
+        if mode == FAST_MODE and len(data) > FAST_MODE_SAMPLE_ROWS:
+            _set_status(key, RUNNING, 0.05, f"Sampling {FAST_MODE_SAMPLE_ROWS:,} of {len(data):,} rows")
+            data = data.sample(n=FAST_MODE_SAMPLE_ROWS, random_state=0)
+
+        if mode == FAST_MODE:
+            report = ProfileReport(data, title=REPORT_TITLE, minimal=True, progress_bar=False)
+        else:
+            report = ProfileReport(data, title=REPORT_TITLE, explorative=True, progress_bar=False)
+
+        _set_status(key, RUNNING, 0.1, "Computing statistics")
+        report.get_description()
+
+        _set_status(key, RUNNING, 0.8, "Rendering the report")
+        html = report.to_html()
+
+        path = report_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(html, encoding="utf-8")
+        tmp_path.replace(path)
+        prune_cache(REPORTS_DIR, REPORTS_MAX_BYTES, keep={path.name})
+        _set_status(key, DONE, 1.0, "Report ready")
+    except Exception as e:
+        _set_status(key, FAILED, 1.0, "Profiling failed", error=str(e))
+
+
+def request_report(data, data_key, attributes, mode=FAST_MODE):
+    """Return the key of the report of ``data``, starting its generation if needed."""
+    key = report_key(data_key, attributes, mode)
+    if report_path(key).is_file():
+        touch(report_path(key))
+        return key
+
+    with _lock:
+        job = _jobs.get(key)
+        if job is not None and job["state"] in (QUEUED, RUNNING):
+            return key
+        _jobs[key] = {"state": QUEUED, "progress": 0.0, "message": "Waiting for the profiling worker",
+                      "error": None, "started": time.time()}
+    _executor.submit(_generate, key, data, mode)
+    return key
+
+
+def report_status(key):
+    """Return the status of a report as a dict with ``state``, ``progress`` and ``message``."""
+    if report_path(key).is_file():
+        return {"state": DONE, "progress": 1.0, "message": "Report ready", "error": None}
+    with _lock:
+        job = _jobs.get(key)
+        if job is None or job["state"] == DONE:
+            # Never requested from this process (e.g. before a restart), or
+            # finished and since pruned from the report cache
+            return {"state": EXPIRED, "progress": 0.0, "error": None,
+                    "message": "The report is unknown or has expired, it has to be generated again"}
+        status = dict(job)
+    status["elapsed"] = time.time() - status.pop("started")
+    return status
+
+
+def load_report(key):
+    """Return the HTML of a finished report, or ``None``."""
+    path = report_path(key)
+
+    def read():
+        return path.read_text(encoding="utf-8") if path.is_file() else None
+    return get_store().get(("profile_report", key), read)
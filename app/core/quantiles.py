@@ -0,0 +1,276 @@
+"""Mergeable quantile sketches for the 'balanced' soft-set thresholds.
+
+A ``QuantileSketch`` is fed column values chunk by chunk (or partition by
+partition, merging the per-partition sketches) and answers quantile queries
+without keeping the whole column in memory:
+
+* While it has seen at most ``exact_limit`` values it keeps them all and
+  answers exactly, with the same linear interpolation as
+  ``pandas.Series.quantile``.
+* Beyond that it keeps a histogram of the distinct values and their counts,
+  which is still exact, as long as there are at most ``distinct_limit`` of
+  them. Integer columns such as ages, tenures or incomes stay in this mode
+  whatever their number of rows, so their thresholds are the same observed
+  values (or midpoints) as on the raw column, and the strict comparisons of
+  the 'balanced' rule put whole groups of tied rows on the same side.
+* With more distinct values it switches to a t-digest: values are merged
+  into weighted centroids whose size is bounded by the k1 scale function, so
+  there are at most about ``compression / 2`` of them. The rank error of a
+  query is about ``pi / compression`` of the count in the middle of the
+  distribution (0.6% with the default compression), and shrinks towards the
+  tails.
+
+Sketches can be serialised with ``to_bytes``/``save`` and stored next to the
+dataset they summarise.
+"""
+import io
+
+import numpy as np
+
+DEFAULT_COMPRESSION = 500
+
+# Up to this many values are kept as-is and quantiles are exact
+DEFAULT_EXACT_LIMIT = 100_000
+
+# Up to this many distinct values are counted and quantiles stay exact
+DEFAULT_DISTINCT_LIMIT = 65_536
+
+
+class QuantileSketch:
+    """A mergeable quantile sketch, exact for small or low-cardinality inputs."""
+
+    def __init__(self, compression=DEFAULT_COMPRESSION, exact_limit=DEFAULT_EXACT_LIMIT,
+                 distinct_limit=DEFAULT_DISTINCT_LIMIT):
+        self.compression = compression
+        self.exact_limit = exact_limit
+        self.distinct_limit = distinct_limit
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        # Raw values while exact, then (distinct, counts) histogram, then
+        # (means, weights) centroids
+        self._values = []
+        self._distinct = None
+        self._counts = None
+        self._means = None
+        self._weights = None
+
+    @property
+    def is_exact(self):
+        return self._means is None
+
+    @property
+    def is_histogram(self):
+        return self._distinct is not None
+
+    @property
+    def _is_raw(self):
+        return self.is_exact and not self.is_histogram
+
+    def update(self, values):
+        """Add ``values`` to the sketch, ignoring NaNs. Returns the sketch."""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+
+        self.count += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        if not self.is_exact:
+            self._add_centroids(values, np.ones(len(values)))
+        elif self.is_histogram:
+            self._add_histogram(*_value_counts(values))
+        else:
+            self._values.append(values)
+            if self.count > self.exact_limit:
+                self._to_histogram()
+        return self
+
+    def merge(self, other):
+        """Merge the sketch ``other`` into this one. Returns the sketch."""
+        if other.count == 0:
+            return self
+
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        if self._is_raw and other._is_raw and self.count <= self.exact_limit:
+            self._values.extend(other._values)
+            return self
+
+        if not other.is_exact:
+            other_values, other_weights = other._means, other._weights
+        elif other.is_histogram:
+            other_values, other_weights = other._distinct, other._counts
+        else:
+            other_values, other_weights = _value_counts(np.concatenate(other._values))
+
+        if self._is_raw:
+            self._to_histogram()
+        if self.is_histogram and other.is_exact:
+            self._add_histogram(other_values, other_weights)
+        else:
+            if self.is_exact:
+                self._to_centroids()
+            self._add_centroids(other_values, other_weights)
+        return self
+
+    def _exact_values(self):
+        if len(self._values) != 1:
+            self._values = [np.concatenate(self._values) if self._values else np.empty(0)]
+        return self._values[0]
+
+    def _to_histogram(self):
+        values = self._exact_values()
+        self._values = []
+        self._distinct = np.empty(0)
+        self._counts = np.empty(0)
+        self._add_histogram(*_value_counts(values))
+
+    def _add_histogram(self, distinct, counts):
+        distinct, inverse = np.unique(np.concatenate([self._distinct, distinct]), return_inverse=True)
+        self._distinct = distinct
+        self._counts = np.bincount(inverse, weights=np.concatenate([self._counts, counts]),
+                                   minlength=len(distinct))
+        if len(self._distinct) > self.distinct_limit:
+            self._to_centroids()
+
+    def _to_centroids(self):
+        if self.is_histogram:
+            values, weights = self._distinct, self._counts
+        else:
+            values = self._exact_values()
+            weights = np.ones(len(values))
+        self._values = []
+        self._distinct = self._counts = None
+        self._means = np.empty(0)
+        self._weights = np.empty(0)
+        self._add_centroids(values, weights)
+
+    def _add_centroids(self, means, weights):
+        means = np.concatenate([self._means, means])
+        weights = np.concatenate([self._weights, weights])
+        if len(means) == 0:
+            # e.g. an empty sketch switching mode to merge a t-digest
+            self._means, self._weights = means, weights
+            return
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+
+        # Consecutive centroids whose middle falls in the same unit of the k1
+        # scale k(q) = compression / (2 pi) * asin(2q - 1) are merged together
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+
+        self._weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / self._weights
+
+    def quantile(self, q):
+        """Return the ``q`` quantile (a float, or an array for an array of ``q``)."""
+        if self.count == 0:
+            return np.nan if np.ndim(q) == 0 else np.full(np.shape(q), np.nan)
+        if self.is_histogram:
+            # Linear interpolation between the values at the ranks around q
+            position = np.asarray(q, dtype=np.float64) * (self.count - 1)
+            below = np.floor(position)
+            ends = np.cumsum(self._counts)
+            low = self._distinct[np.searchsorted(ends, below, side="right")]
+            high = self._distinct[np.minimum(np.searchsorted(ends, below + 1, side="right"), len(ends) - 1)]
+            result = low + (position - below) * (high - low)
+            return float(result) if np.ndim(q) == 0 else result
+        if self.is_exact:
+            return np.quantile(self._exact_values(), q)
+
+        # Centroids sit at the middle of the ranks they cover, the extremes at
+        # the first and last rank, mirroring linear interpolation on raw values
+        positions = np.cumsum(self._weights) - (self._weights + 1) / 2
+        positions = np.r_[0.0, positions, self.count - 1]
+        means = np.r_[self.min, self._means, self.max]
+        return np.interp(np.asarray(q) * (self.count - 1), positions, means)
+
+    def to_bytes(self):
+        """Serialise the sketch."""
+        buffer = io.BytesIO()
+        state = {
+            "params": np.array([self.compression, self.exact_limit, self.count, self.min, self.max,
+                                self.distinct_limit], dtype=np.float64),
+            "exact": np.array(self.is_exact)
+        }
+        if self.is_histogram:
+            state["distinct"] = self._distinct
+            state["counts"] = self._counts
+        elif self.is_exact:
+            state["values"] = self._exact_values()
+        else:
+            state["means"] = self._means
+            state["weights"] = self._weights
+        np.savez(buffer, **state)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Deserialise a sketch produced by ``to_bytes``."""
+        with np.load(io.BytesIO(data)) as state:
+            compression, exact_limit, count, minimum, maximum = state["params"][:5]
+            # Sketches saved before the histogram mode have no distinct limit
+            distinct_limit = state["params"][5] if len(state["params"]) > 5 else DEFAULT_DISTINCT_LIMIT
+            sketch = cls(compression=float(compression), exact_limit=int(exact_limit),
+                         distinct_limit=int(distinct_limit))
+            sketch.count = int(count)
+            sketch.min = float(minimum)
+            sketch.max = float(maximum)
+            if "distinct" in state:
+                sketch._distinct = state["distinct"]
+                sketch._counts = state["counts"]
+            elif bool(state["exact"]):
+                sketch._values = [state["values"]]
+            else:
+                sketch._means = state["means"]
+                sketch._weights = state["weights"]
+        return sketch
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def _value_counts(values):
+    distinct, counts = np.unique(values, return_counts=True)
+    return distinct, counts.astype(np.float64)
+
+
+def sketch_columns(data, columns, chunk_size=1_000_000, **kwargs):
+    """Build one sketch per column of ``columns`` over ``data``.
+
+    ``data`` is a DataFrame or an iterable of DataFrame chunks.
+    """
+    chunks = [data] if hasattr(data, "columns") else data
+    sketches = {column: QuantileSketch(**kwargs) for column in columns}
+    for chunk in chunks:
+        for start in range(0, len(chunk), chunk_size):
+            part = chunk.iloc[start:start + chunk_size]
+            for column, sketch in sketches.items():
+                sketch.update(part[column].to_numpy(dtype=np.float64, na_value=np.nan))
+    return sketches
+
+
+def merge_sketches(sketch_maps):
+    """Merge several ``{column: sketch}`` mappings column by column."""
+    merged = {}
+    for sketches in sketch_maps:
+        for column, sketch in sketches.items():
+            # The fold starts from the first non-empty sketch of the column,
+            # so empty (e.g. all-NaN) partitions never set its mode
+            if column in merged and merged[column].count:
+                merged[column].merge(sketch)
+            elif column not in merged or sketch.count:
+                merged[column] = sketch
+    return merged
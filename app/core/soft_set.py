@@ -0,0 +1,164 @@
+"""Soft-set mapping used by the Conflict Analysis page.
+
+Every attribute is mapped to an opinion: ``1`` (positive), ``0`` (neutral)
+or ``-1`` (negative), according to one of three rules:
+
+* ``'scale'``: 3 and above is positive, 2 is neutral, anything else negative.
+* ``{'low': ..., 'high': ...}``: the ``high`` value is positive, the ``low``
+  value negative, anything else neutral.
+* ``'balanced'``: above the 60th percentile is positive, below the 40th
+  percentile negative, anything in between neutral.
+
+The mapping is done column by column with vectorized comparisons and written
+straight into a compact ``int8`` matrix.
+"""
+import numpy as np
+import pandas as pd
+
+# Default mapping rules for the IBM HR attrition attributes
+MAPPING_RULES = {
+    'Attrition': {'low': 'No', 'high': 'Yes'},
+    'RelationshipSatisfaction': 'scale',
+    'WorkLifeBalance': 'scale',
+    'EnvironmentSatisfaction': 'scale',
+    'JobSatisfaction': 'scale',
+    'Education': 'scale',
+    'PerformanceRating': "scale",
+    'Age': 'balanced',
+    'MonthlyIncome': 'balanced',
+    'YearsAtCompany': 'balanced',
+    'OverTime': {'low': 'No', 'high': 'Yes'}
+}
+
+# Percentiles used as thresholds by the 'balanced' rule
+BALANCED_LOW_QUANTILE = 0.4
+BALANCED_HIGH_QUANTILE = 0.6
+
+
+def available_rules(columns, rules=MAPPING_RULES):
+    """Return the subset of ``rules`` whose attribute is in ``columns``, in rule order."""
+    columns = set(columns)
+    return {attr: rule for attr, rule in rules.items() if attr in columns}
+
+
+def balanced_attributes(rules):
+    """Return the attributes mapped with the 'balanced' rule."""
+    return [attr for attr, rule in rules.items() if rule == 'balanced']
+
+
+def compute_stat_values(data, rules, sketches=None):
+    """Compute the low/high thresholds for every 'balanced' attribute of ``data``.
+
+    Thresholds are read from ``sketches`` (a ``{column: QuantileSketch}``
+    mapping built over the same data) when it covers the attribute, and
+    computed exactly from ``data`` otherwise.
+    """
+    sketches = sketches or {}
+    stat_values = {}
+    for attr in balanced_attributes(rules):
+        if attr in sketches:
+            low, high = sketches[attr].quantile([BALANCED_LOW_QUANTILE, BALANCED_HIGH_QUANTILE])
+        else:
+            low = data[attr].quantile(BALANCED_LOW_QUANTILE)
+            high = data[attr].quantile(BALANCED_HIGH_QUANTILE)
+        stat_values[attr] = {
+            'low_threshold': low,
+            'high_threshold': high
+        }
+    return stat_values
+
+
+def _opinion_masks(column, rule, stat_value=None):
+    # Returns boolean (positive, negative) masks; everything else is neutral.
+    # The positive test always takes precedence, as in the original row-wise
+    # mapping.
+    if rule == 'scale':
+        positive = column.ge(3).to_numpy(dtype=bool)
+        negative = ~(positive | column.eq(2).to_numpy(dtype=bool))
+    elif isinstance(rule, dict):
+        positive = column.eq(rule['high']).to_numpy(dtype=bool)
+        negative = column.eq(rule['low']).to_numpy(dtype=bool) & ~positive
+    elif rule == 'balanced':
+        positive = column.gt(stat_value['high_threshold']).to_numpy(dtype=bool)
+        negative = column.lt(stat_value['low_threshold']).to_numpy(dtype=bool) & ~positive
+    else:
+        raise ValueError(f"Unknown mapping rule: {rule!r}")
+    return positive, negative
+
+
+def map_soft_set(data, rules, stat_values=None):
+    """Map ``data`` to an ``(n_rows, n_rules)`` ``int8`` opinion matrix.
+
+    Columns follow the order of ``rules``. ``stat_values`` holds the thresholds
+    of the 'balanced' attributes and is computed from ``data`` when omitted.
+    """
+    if stat_values is None:
+        stat_values = compute_stat_values(data, rules)
+
+    # Fortran order keeps each attribute contiguous, which is how it is
+    # both written here and counted later on
+    mapped = np.zeros((len(data), len(rules)), dtype=np.int8, order='F')
+    for j, (attr, rule) in enumerate(rules.items()):
+        positive, negative = _opinion_masks(data[attr], rule, stat_values.get(attr))
+        column = mapped[:, j]
+        column[positive] = 1
+        column[negative] = -1
+    return mapped
+
+
+def build_soft_set(data, rules, stat_values=None):
+    """Return the multi-soft-set representation of ``data`` as an ``int8`` DataFrame."""
+    mapped = map_soft_set(data, rules, stat_values)
+    return pd.DataFrame(mapped, columns=list(rules.keys()), copy=False)
+
+
+# Opinion labels used in the conflict summary
+OPINION_LABELS = {-1: '-', 0: '0', 1: '+'}
+
+SUMMARY_COLUMNS = ['Attribute', 'Opinion', 'Support', 'Coverage', 'Certainty', 'Strength']
+
+
+def opinion_counts(mapped):
+    """Count the opinions of every attribute of a mapped soft set.
+
+    Returns an ``(n_attributes, 3)`` ``int64`` array with the number of
+    ``-1``, ``0`` and ``1`` opinions of each column of ``mapped``.
+    """
+    mapped = np.asarray(mapped)
+    counts = np.empty((mapped.shape[1], 3), dtype=np.int64)
+    for j in range(mapped.shape[1]):
+        counts[j] = np.bincount(mapped[:, j] + 1, minlength=3)
+    return counts
+
+
+def conflict_summary_from_counts(attributes, counts):
+    """Build the conflict summary table from per-attribute opinion counts.
+
+    Rows are sorted by attribute name and opinion, and opinions that never
+    occur for an attribute are left out. Support is the number of rows with
+    the opinion, Coverage the share of all rows with that opinion, Certainty
+    the share of the attribute's rows and Strength the share of all rows.
+    """
+    attributes = list(attributes)
+    order = sorted(range(len(attributes)), key=lambda j: attributes[j])
+    counts = np.asarray(counts, dtype=np.int64)[order]
+
+    attribute_index, opinion_index = np.nonzero(counts > 0)
+    support = counts[attribute_index, opinion_index]
+    opinion_support = counts.sum(axis=0)
+    attribute_support = counts.sum(axis=1)
+
+    opinion_labels = np.array([OPINION_LABELS[-1], OPINION_LABELS[0], OPINION_LABELS[1]], dtype=object)
+    return pd.DataFrame({
+        'Attribute': np.array([attributes[j] for j in order], dtype=object)[attribute_index],
+        'Opinion': opinion_labels[opinion_index],
+        'Support': support,
+        'Coverage': support / opinion_support[opinion_index],
+        'Certainty': support / attribute_support[attribute_index],
+        'Strength': support / support.sum()
+    }, columns=SUMMARY_COLUMNS)
+
+
+def conflict_summary(soft_set):
+    """Return the conflict summary of a multi-soft-set DataFrame."""
+    return conflict_summary_from_counts(soft_set.columns, opinion_counts(soft_set))
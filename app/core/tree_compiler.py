@@ -0,0 +1,301 @@
+"""Compiles the shipped tree ensembles into flat node tables for fast scoring.
+
+Calling ``predict`` on an XGBoost or scikit-learn estimator for a single
+employee is dominated by input validation and per-call overhead, not by tree
+evaluation. ``compile_model`` converts an ensemble into a handful of NumPy
+arrays holding every node of every tree, which are then evaluated for all
+trees at once, straight from a feature vector.
+
+Every split is normalised to "go left when ``x <= threshold``", leaves point
+to themselves, and the leaf values are pre-scaled so that the sum over all
+trees plus ``base_margin`` is the ensemble's raw margin (log-odds) of the
+positive class. Supported models:
+
+* ``xgboost.XGBClassifier`` with the ``binary:logistic`` objective
+* ``sklearn.ensemble.GradientBoostingClassifier`` (binary, log-loss)
+* ``sklearn.ensemble.AdaBoostClassifier`` (binary, SAMME)
+
+Every node also stores ``node_value``, the cover-weighted mean of the leaf
+values below it, i.e. the expected margin of the tree once the path has
+reached the node. ``contributions`` attributes each prediction to the
+features with it (Saabas' method): every split on the path moves the margin
+by the difference between the child's and the parent's expected value, and
+that difference is credited to the split feature. The contributions of the
+path to every node are precomputed once, so explaining a batch costs one
+``apply`` and a sparse sum of the rows of the leaves reached.
+"""
+import json
+
+import numpy as np
+
+
+class CompiledEnsemble:
+    """A tree ensemble stored as flat node arrays.
+
+    ``feature``, ``threshold``, ``left``, ``right``, ``default_left``,
+    ``value`` and ``node_value`` are indexed by node, ``roots`` holds the root node of every tree
+    and ``max_depth`` the depth of the deepest tree. ``classes`` are the two
+    class labels returned by ``predict``.
+    """
+
+    def __init__(self, feature, threshold, left, right, default_left, value, roots, max_depth,
+                 base_margin=0.0, classes=(0, 1), n_features=None, node_value=None):
+        self.feature = np.ascontiguousarray(feature, dtype=np.intp)
+        self.threshold = np.ascontiguousarray(threshold)
+        self.left = np.ascontiguousarray(left, dtype=np.intp)
+        self.right = np.ascontiguousarray(right, dtype=np.intp)
+        self.default_left = np.ascontiguousarray(default_left, dtype=bool)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.node_value = self.value if node_value is None else np.ascontiguousarray(node_value, dtype=np.float64)
+        self.roots = np.ascontiguousarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.base_margin = float(base_margin)
+        self.classes = np.asarray(classes)
+        self.n_features = n_features
+        self._path_contributions = None
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def _as_matrix(self, X):
+        # Both libraries evaluate splits on float32 features
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if self.n_features is not None and X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}.")
+        return X
+
+    def apply(self, X):
+        """Return the leaf reached in every tree, as an ``(n_rows, n_trees)`` array."""
+        X = self._as_matrix(X)
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+        rows = np.arange(len(X))[:, None]
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[nodes]]
+            go_left = (x <= self.threshold[nodes]) | (np.isnan(x) & self.default_left[nodes])
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def decision_function(self, X):
+        """Return the raw margin (log-odds of the positive class) for every row."""
+        return self.base_margin + self.value[self.apply(X)].sum(axis=1)
+
+    def predict_proba(self, X):
+        """Return the probability of the positive class for every row."""
+        return 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+
+    def predict(self, X):
+        """Return the predicted class label for every row."""
+        return self.classes[(self.decision_function(X) > 0).astype(np.intp)]
+
+    @property
+    def path_contributions(self):
+        """The ``(n_nodes, n_features)`` contributions of the path from the root to every node.
+
+        Computed on first use: a child inherits its parent's row and credits
+        the difference of their expected values to the parent's split feature.
+        """
+        if self._path_contributions is None:
+            n_features = self.n_features or int(self.feature.max()) + 1
+            paths = np.zeros((self.n_nodes, n_features))
+            # Children always come after their parent, leaves point to themselves
+            for node in range(self.n_nodes):
+                for child in (self.left[node], self.right[node]):
+                    if child != node:
+                        paths[child] = paths[node]
+                        paths[child, self.feature[node]] += self.node_value[child] - self.node_value[node]
+            self._path_contributions = paths
+        return self._path_contributions
+
+    def contributions(self, X, leaves=None):
+        """Return the contribution of every feature to the margin of every row.
+
+        The result has one column per feature plus a last column holding the
+        expected margin (the same for every row), like XGBoost's
+        ``pred_contribs``; each row sums to ``decision_function``. ``leaves``
+        may give the result of ``apply(X)`` when it is already known.
+        """
+        from scipy.sparse import csr_matrix
+
+        if leaves is None:
+            leaves = self.apply(X)
+        n_rows, n_trees = leaves.shape
+        # Sum the path contributions of the leaves reached by every row
+        reached = csr_matrix(
+            (np.ones(leaves.size), leaves.ravel(), np.arange(0, leaves.size + 1, n_trees)),
+            shape=(n_rows, self.n_nodes)
+        )
+        contributions = np.empty((n_rows, self.path_contributions.shape[1] + 1))
+        contributions[:, :-1] = reached @ self.path_contributions
+        contributions[:, -1] = self.base_margin + self.node_value[self.roots].sum()
+        return contributions
+
+
+def _expected_values(left, right, value, cover):
+    # Cover-weighted mean of the leaf values below every node
+    expected = np.where(left < 0, value, 0.0).astype(np.float64)
+    cover = np.asarray(cover, dtype=np.float64)
+    # Children always have larger ids than their parent, so walking the
+    # nodes backwards visits both children first
+    for node in range(len(left) - 1, -1, -1):
+        if left[node] >= 0:
+            total = cover[left[node]] + cover[right[node]]
+            if total > 0:
+                expected[node] = (cover[left[node]] * expected[left[node]]
+                                  + cover[right[node]] * expected[right[node]]) / total
+            else:
+                expected[node] = (expected[left[node]] + expected[right[node]]) / 2
+    return expected
+
+
+def _concatenate(trees, max_depth, **kwargs):
+    # ``trees`` holds per-tree (feature, threshold, left, right, default_left,
+    # value, cover) arrays with tree-local child indices and -1 for "no child"
+    feature, threshold, left, right, default_left, value, node_value, roots = [], [], [], [], [], [], [], []
+    offset = 0
+    for tree_feature, tree_threshold, tree_left, tree_right, tree_default_left, tree_value, tree_cover in trees:
+        n_nodes = len(tree_feature)
+        node_ids = np.arange(n_nodes)
+        is_leaf = tree_left < 0
+
+        # Leaves point to themselves so every tree can be walked max_depth times
+        feature.append(np.where(is_leaf, 0, tree_feature))
+        threshold.append(tree_threshold)
+        left.append(np.where(is_leaf, node_ids, tree_left) + offset)
+        right.append(np.where(is_leaf, node_ids, tree_right) + offset)
+        default_left.append(tree_default_left)
+        value.append(np.where(is_leaf, tree_value, 0.0))
+        node_value.append(_expected_values(tree_left, tree_right, tree_value, tree_cover))
+        roots.append(offset)
+        offset += n_nodes
+
+    return CompiledEnsemble(
+        np.concatenate(feature), np.concatenate(threshold), np.concatenate(left),
+        np.concatenate(right), np.concatenate(default_left), np.concatenate(value),
+        np.asarray(roots), max_depth, node_value=np.concatenate(node_value), **kwargs
+    )
+
+
+def _tree_depth(left, right):
+    depth = np.zeros(len(left), dtype=np.intp)
+    # Children always have larger ids than their parent in both libraries
+    for node in range(len(left)):
+        if left[node] >= 0:
+            depth[left[node]] = depth[node] + 1
+            depth[right[node]] = depth[node] + 1
+    return int(depth.max())
+
+
+def compile_xgboost(model):
+    """Compile a binary ``XGBClassifier`` (or its ``Booster``)."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    learner = json.loads(booster.save_raw(raw_format="json"))["learner"]
+    objective = learner["objective"]["name"]
+    if objective != "binary:logistic":
+        raise NotImplementedError(f"Unsupported XGBoost objective: {objective}")
+
+    gbm = learner["gradient_booster"]["model"]
+    trees = gbm["trees"]
+    # predict() only uses the trees up to the best iteration when early stopping was used
+    best_iteration = booster.attr("best_iteration")
+    if best_iteration is not None:
+        trees = trees[:gbm["iteration_indptr"][int(best_iteration) + 1]]
+
+    compiled_trees = []
+    max_depth = 0
+    for tree in trees:
+        left = np.asarray(tree["left_children"], dtype=np.intp)
+        right = np.asarray(tree["right_children"], dtype=np.intp)
+        conditions = np.asarray(tree["split_conditions"], dtype=np.float32)
+        # XGBoost goes left when x < threshold; for float32 inputs this is the
+        # same as x <= the next float32 below the threshold
+        thresholds = np.nextafter(conditions, np.float32(-np.inf))
+        compiled_trees.append((
+            np.asarray(tree["split_indices"], dtype=np.intp), thresholds, left, right,
+            np.asarray(tree["default_left"], dtype=bool), conditions.astype(np.float64),
+            np.asarray(tree["sum_hessian"], dtype=np.float64)
+        ))
+        max_depth = max(max_depth, _tree_depth(left, right))
+
+    base_score = float(learner["learner_model_param"]["base_score"])
+    classes = getattr(model, "classes_", None)
+    return _concatenate(
+        compiled_trees, max_depth,
+        base_margin=np.log(base_score / (1.0 - base_score)),
+        classes=classes if classes is not None else (0, 1),
+        n_features=int(learner["learner_model_param"]["num_feature"])
+    )
+
+
+def _sklearn_tree_arrays(tree, leaf_value):
+    default_left = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=bool))
+    return (
+        tree.feature, tree.threshold, tree.children_left, tree.children_right,
+        np.asarray(default_left, dtype=bool), leaf_value, tree.weighted_n_node_samples
+    )
+
+
+def compile_gradient_boosting(model):
+    """Compile a binary, log-loss ``GradientBoostingClassifier``."""
+    if len(model.classes_) != 2 or model.loss not in ("log_loss", "deviance"):
+        raise NotImplementedError("Only binary log-loss gradient boosting is supported.")
+
+    # The initial estimator contributes a constant margin
+    if model.init_ == "zero":
+        base_margin = 0.0
+    elif hasattr(model.init_, "class_prior_"):
+        prior = np.clip(model.init_.class_prior_[1], np.finfo(np.float64).eps, 1 - np.finfo(np.float64).eps)
+        base_margin = np.log(prior / (1.0 - prior))
+    else:
+        raise NotImplementedError("Only constant initial estimators are supported.")
+
+    trees = []
+    for estimator in model.estimators_[:, 0]:
+        tree = estimator.tree_
+        trees.append(_sklearn_tree_arrays(tree, model.learning_rate * tree.value[:, 0, 0]))
+    return _concatenate(
+        trees, max(estimator.tree_.max_depth for estimator in model.estimators_[:, 0]),
+        base_margin=base_margin, classes=model.classes_, n_features=model.n_features_in_
+    )
+
+
+def compile_adaboost(model):
+    """Compile a binary ``AdaBoostClassifier`` fitted with SAMME."""
+    if len(model.classes_) != 2 or getattr(model, "algorithm", "SAMME") == "SAMME.R":
+        raise NotImplementedError("Only binary SAMME AdaBoost is supported.")
+
+    # The decision function is 2 * sum(+/- w) / sum(w) and the probability
+    # its logistic transform, so each tree votes +/- 2w / sum(w)
+    total_weight = model.estimator_weights_.sum()
+    trees = []
+    for estimator, weight in zip(model.estimators_, model.estimator_weights_):
+        tree = estimator.tree_
+        votes_positive = tree.value[:, 0, :].argmax(axis=1) == 1
+        leaf_value = np.where(votes_positive, 2.0 * weight, -2.0 * weight) / total_weight
+        trees.append(_sklearn_tree_arrays(tree, leaf_value))
+    return _concatenate(
+        trees, max(estimator.tree_.max_depth for estimator in model.estimators_),
+        classes=model.classes_, n_features=model.n_features_in_
+    )
+
+
+def compile_model(model):
+    """Compile ``model`` into a ``CompiledEnsemble``.
+
+    Raises ``NotImplementedError`` for unsupported model types.
+    """
+    # Dispatch on the class name so that neither library has to be imported here
+    kind = type(model).__name__
+    if kind in ("XGBClassifier", "Booster"):
+        return compile_xgboost(model)
+    if kind == "GradientBoostingClassifier":
+        return compile_gradient_boosting(model)
+    if kind == "AdaBoostClassifier":
+        return compile_adaboost(model)
+    raise NotImplementedError(f"Cannot compile models of type {kind}.")
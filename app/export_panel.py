@@ -0,0 +1,28 @@
+"""Download buttons whose file is only built when the user clicks them.
+
+The content is produced by a callable run by Streamlit on download (see
+``core.exports``), so ordinary reruns never serialise the results, and
+downloading does not rerun the page.
+"""
+import streamlit as st
+
+from core.exports import FORMATS, file_name, mime_type
+
+
+def export_button(label, export, file_stem, key):
+    """Show a format picker and a download button.
+
+    ``export`` is called with the chosen format (a key of ``FORMATS``) when
+    the button is clicked and returns the file content.
+    """
+    fmt = st.selectbox(
+        "Export format", list(FORMATS), format_func=lambda fmt: FORMATS[fmt][0], key=f"{key}_format"
+    )
+    st.download_button(
+        label=label,
+        data=lambda: export(fmt),
+        file_name=file_name(file_stem, fmt),
+        mime=mime_type(fmt),
+        key=key,
+        on_click="ignore"
+    )
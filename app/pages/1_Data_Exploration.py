@@ -1,14 +1,25 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-from ydata_profiling import ProfileReport
 import streamlit.components.v1 as components
-import mpld3
+
+from core.datasets import dataset_ref, load_sketches, load_upload
+from core.exports import export_bytes
+from core.perf import stage
+from core.plotting import (
+    DEFAULT_POINT_BUDGET, HISTOGRAM_BINS, MAX_BARS, cached_aggregate, downsample_line, limit_bars,
+    sample_points, scatter_histogram
+)
+from core.profiling import (
+    DONE, EXPIRED, FAILED, FAST_MODE, FAST_MODE_SAMPLE_ROWS, FULL_MODE, load_report, report_key, report_status,
+    request_report
+)
+from export_panel import export_button
+from perf_panel import begin_page, finish_page
 
 # Set page configuration
 st.set_page_config(layout="wide", page_title="streData Exploration Tool")
+begin_page("Data Exploration")
 
 # Sidebar for uploading dataset
 # Header
@@ -22,12 +33,20 @@ if uploaded_file is None:
     st.warning("Please upload a dataset!")
 
 else:
-    st.session_state['data'] = pd.read_csv(uploaded_file)
+    # Parsed once per distinct file content and shared across sessions; the
+    # session only keeps a reference into the process-wide store
+    with stage("load_upload"):
+        data_key, data = load_upload(uploaded_file, st.session_state)
+    if st.session_state.get('data_key') != data_key:
+        st.session_state['data_key'] = data_key
+        st.session_state['dataset'] = dataset_ref(data_key)
+        # Quantile sketches of the 'balanced' attributes, used for the conflict analysis thresholds
+        st.session_state['quantile_sketches'] = load_sketches(data_key)
     st.success("Dataset uploaded successfully!")
 
     # Display Dataset Overview
     st.write("### Dataset Overview")
-    st.write(st.session_state['data'].head())
+    st.write(data.head())
 
     # Check for missing attributes
     expected_attributes = [
@@ -35,7 +54,7 @@ else:
         "EnvironmentSatisfaction", "Age", "MonthlyIncome",
         "YearsAtCompany", "OverTime"
     ]
-    missing_attributes = [attr for attr in expected_attributes if attr not in st.session_state['data'].columns]
+    missing_attributes = [attr for attr in expected_attributes if attr not in data.columns]
     st.write("### Attribute Validation")
     if missing_attributes:
         st.warning(f"The following attributes are missing: {', '.join(missing_attributes)}")
@@ -46,8 +65,8 @@ else:
     st.write("### Select Attributes for Analysis")
     selected_attributes = st.multiselect(
         "Choose attributes to include in the analysis:",
-        st.session_state['data'].columns.tolist(),
-        default=[attr for attr in expected_attributes if attr in st.session_state['data'].columns]
+        data.columns.tolist(),
+        default=[attr for attr in expected_attributes if attr in data.columns]
     )
     st.session_state['selected_attributes'] = selected_attributes
     if not selected_attributes:
@@ -55,12 +74,13 @@ else:
     else:
         # Filtered Dataset Overview
         st.write("### Filtered Dataset")
-        filtered_data = st.session_state['data'][selected_attributes]
+        filtered_data = data[selected_attributes]
         st.write(filtered_data.head())
 
         # Summary Statistics
         st.write("### Summary Statistics")
-        st.write(filtered_data.describe())
+        with stage("summary_statistics"):
+            st.write(filtered_data.describe())
 
         # Null Value Counts
         st.write("### Null Value Counts")
@@ -69,14 +89,31 @@ else:
         # Quick Visualizations
         st.write("### Quick Visualizations")
         chart_type = st.selectbox("Choose a chart type", ["Line Chart", "Bar Chart", "Scatter Plot"])
+        point_budget = int(st.number_input(
+            "Point budget", min_value=100, value=DEFAULT_POINT_BUDGET, step=1000,
+            help="Above this number of points, charts are drawn from aggregated or downsampled data"
+        ))
+
+        # Imported on first use, so the page paints before any data is uploaded
+        import matplotlib.pyplot as plt
 
         fig, ax = plt.subplots()
+        # Aggregated charts are rendered as static images instead of interactive mpld3 charts
+        aggregated = False
 
         if chart_type == "Line Chart":
             x = st.selectbox("X-axis", selected_attributes)
             y = st.selectbox("Y-axis", selected_attributes)
-            filtered_data.groupby(x)[y].mean().plot(kind='line', ax=ax)
-            ax.set_title(f"Line Chart of {y} by {x}")
+
+            def aggregate_line():
+                series = filtered_data.groupby(x)[y].mean()
+                # Keep the length before downsampling, which tells whether it happened
+                return downsample_line(series, point_budget), len(series)
+
+            line, n_points = cached_aggregate((data_key, "line", x, y, point_budget), aggregate_line)
+            aggregated = n_points > point_budget
+            line.plot(kind='line', ax=ax)
+            ax.set_title(f"Line Chart of {y} by {x}" + (" (downsampled)" if aggregated else ""))
             ax.set_xlabel(x)
             ax.set_ylabel(y)
         elif chart_type == "Bar Chart":
@@ -84,24 +121,45 @@ else:
             aggregation_method = st.selectbox(
                 "Aggregation Method", ["Count", "Sum", "Mean"], key="agg_method"
             )
+            value_column = None
+            if aggregation_method != "Count":
+                value_columns = [
+                    c for c in selected_attributes
+                    if c != column and pd.api.types.is_numeric_dtype(filtered_data[c])
+                ]
+                value_column = st.selectbox("Value Column", value_columns, key="bar_value_col")
             sort_bars = st.checkbox("Sort Bars", value=True)
             
-            if column:
+            if column and aggregation_method != "Count" and value_column is None:
+                st.warning("Please select a numeric attribute to aggregate.")
+            elif column:
                 try:
-                    if aggregation_method == "Count":
-                        aggregated_data = filtered_data[column].value_counts()
-                    elif aggregation_method == "Sum":
-                        aggregated_data = filtered_data.groupby(column).sum().iloc[:, 0]
-                    else:  # Mean
-                        aggregated_data = filtered_data.groupby(column).mean().iloc[:, 0]
+                    def aggregate_bars():
+                        if aggregation_method == "Count":
+                            return filtered_data[column].value_counts()
+                        grouped = filtered_data.groupby(column, observed=True)[value_column]
+                        if aggregation_method == "Sum":
+                            return grouped.sum()
+                        return grouped.mean()
+
+                    aggregated_data = cached_aggregate(
+                        (data_key, "bar", column, aggregation_method, value_column),
+                        aggregate_bars
+                    )
                     
                     if sort_bars:
                         aggregated_data = aggregated_data.sort_values(ascending=False)
+
+                    aggregated = len(aggregated_data) > MAX_BARS
+                    aggregated_data = limit_bars(aggregated_data, MAX_BARS)
                     
                     aggregated_data.plot(
                         kind="bar", ax=ax, color="skyblue", edgecolor="black", alpha=0.8
                     )
-                    ax.set_title(f"{aggregation_method} of {column}", fontsize=14, pad=15)
+                    title = f"{aggregation_method} of {column}"
+                    if value_column:
+                        title = f"{aggregation_method} of {value_column} by {column}"
+                    ax.set_title(title, fontsize=14, pad=15)
                     ax.set_xlabel(column, fontsize=12)
                     ax.set_ylabel(f"{aggregation_method} Value", fontsize=12)
                     ax.grid(axis="y", linestyle="--", alpha=0.7)
@@ -112,38 +170,100 @@ else:
         elif chart_type == "Scatter Plot":
             x = st.selectbox("X-axis", selected_attributes)
             y = st.selectbox("Y-axis", selected_attributes)
-            ax.scatter(filtered_data[x], filtered_data[y])
-            ax.set_title(f"Scatter Plot of {y} vs {x}")
+            numeric = all(pd.api.types.is_numeric_dtype(filtered_data[c]) for c in (x, y))
+            if len(filtered_data) <= point_budget:
+                ax.scatter(filtered_data[x], filtered_data[y])
+                ax.set_title(f"Scatter Plot of {y} vs {x}")
+            elif numeric:
+                # Density of the points instead of the points themselves
+                aggregated = True
+                counts, x_edges, y_edges = cached_aggregate(
+                    (data_key, "hist2d", x, y, HISTOGRAM_BINS),
+                    lambda: scatter_histogram(filtered_data[x], filtered_data[y], HISTOGRAM_BINS)
+                )
+                mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts.T, 0), cmap="viridis")
+                fig.colorbar(mesh, ax=ax, label="Rows")
+                ax.set_title(f"Density of {y} vs {x} ({len(filtered_data):,} rows)")
+            else:
+                sample_x, sample_y = cached_aggregate(
+                    (data_key, "sample", x, y, point_budget),
+                    lambda: sample_points(filtered_data[x], filtered_data[y], point_budget)
+                )
+                ax.scatter(sample_x, sample_y)
+                ax.set_title(f"Scatter Plot of {y} vs {x} (sample of {point_budget:,} rows)")
             ax.set_xlabel(x)
             ax.set_ylabel(y)
 
-        fig_html = mpld3.fig_to_html(fig)
-        components.html(fig_html, height= 500)
+        with stage("chart_render"):
+            if aggregated:
+                st.pyplot(fig)
+            else:
+                import mpld3
+
+                fig_html = mpld3.fig_to_html(fig)
+                components.html(fig_html, height= 500)
+        plt.close(fig)
 
         # Detailed Data Profiling
         st.write("### Detailed Data Profiling")
+        profiling_mode = st.radio(
+            "Profiling mode", [FAST_MODE, FULL_MODE], horizontal=True,
+            format_func=lambda mode: {
+                FAST_MODE: f"Fast (minimal settings, sample of up to {FAST_MODE_SAMPLE_ROWS:,} rows)",
+                FULL_MODE: "Full (explorative, every row)"
+            }[mode]
+        )
         if st.button("Generate Data Profiling Report"):
-            with st.spinner("Generating report..."):
-                profile_report = ProfileReport(filtered_data, title="Pandas Profiling Report", explorative=True)
-                st.session_state['profile_report_html'] = profile_report.to_html()
-                st.session_state['profile_report'] = profile_report
-                st.success("Report generated!")
-        if 'profile_report_html' in st.session_state:
-            components.html(st.session_state['profile_report_html'], height=1000, scrolling=True)
+            # Generated in the background and cached on disk; only the key is kept in the session
+            st.session_state['profile_report_key'] = request_report(
+                filtered_data, st.session_state['data_key'], selected_attributes, profiling_mode
+            )
+
+        @st.fragment(run_every=1.0)
+        def show_profiling_progress(key):
+            status = report_status(key)
+            if status['state'] in (DONE, FAILED, EXPIRED):
+                st.rerun()
+            st.progress(status['progress'], text=f"{status['message']} ({status['elapsed']:.0f}s elapsed)")
+
+        profile_report_html = None
+        if 'profile_report_key' in st.session_state:
+            status = report_status(st.session_state['profile_report_key'])
+            if status['state'] == DONE:
+                profile_report_html = load_report(st.session_state['profile_report_key'])
+            if status['state'] == EXPIRED or (status['state'] == DONE and profile_report_html is None):
+                # Lost with a restart or pruned from the cache: generate it again while it
+                # still matches the selection, otherwise forget it
+                if st.session_state['profile_report_key'] == report_key(
+                        st.session_state['data_key'], selected_attributes, profiling_mode):
+                    request_report(filtered_data, st.session_state['data_key'], selected_attributes, profiling_mode)
+                    show_profiling_progress(st.session_state['profile_report_key'])
+                else:
+                    del st.session_state['profile_report_key']
+                    st.info("The profiling report has expired, generate it again.")
+            elif status['state'] == DONE:
+                components.html(profile_report_html, height=1000, scrolling=True)
+            elif status['state'] == FAILED:
+                st.error(f"Error generating the profiling report: {status['error']}")
+            else:
+                show_profiling_progress(st.session_state['profile_report_key'])
 
         # Export Options
         st.write("### Export Options")
-        if 'profile_report_html' in st.session_state:
+        # Downloads are built only when clicked
+        if profile_report_html is not None:
+            report_key = st.session_state['profile_report_key']
             st.download_button(
                 "Download Profiling Report",
-                data=st.session_state['profile_report_html'],
+                data=lambda: load_report(report_key),
                 file_name="profiling_report.html",
-                mime="text/html"
+                mime="text/html",
+                on_click="ignore"
             )
         if 'filtered_data' in locals():
-            st.download_button(
-                "Download Filtered Dataset",
-                data=filtered_data.to_csv(index=False).encode('utf-8'),
-                file_name="filtered_dataset.csv",
-                mime="text/csv"
+            export_button(
+                "Download Filtered Dataset", lambda fmt: export_bytes(filtered_data, fmt),
+                "filtered_dataset", key="filtered_download"
             )
+
+finish_page()
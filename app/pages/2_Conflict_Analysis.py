@@ -1,16 +1,152 @@
+import io
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import networkx as nx
-from PIL import Image
+
+from core.conflict_graph import (
+    DEFAULT_CERTAINTY_THRESHOLD, breakpoint_index, cached_threshold_structure, render_conflict_graph,
+    render_conflict_graph_at, render_pairwise_graph
+)
+from core.pairwise_conflicts import DEFAULT_DEGREE_THRESHOLD, MAX_EDGES, named_edges, pairwise_counts, pairwise_edges
+from core.partitioned_conflicts import read_summary
+from core.perf import stage
+from core.soft_set import MAPPING_RULES, available_rules, build_soft_set, compute_stat_values, conflict_summary
+from perf_panel import begin_page, finish_page
 
 st.set_page_config(layout="wide")
+begin_page("Conflict Analysis")
 
 st.title("Conflict Analysis")
 
+def soft_set_of(attributes, data, quantile_sketches):
+    """Return the multi-soft-set of the ``attributes`` of a dataset."""
+    filtered_data = data[list(attributes)]
+    available_mapping_rules = available_rules(filtered_data.columns, MAPPING_RULES)
+
+    # Compute necessary statistics for 'balanced' rules, from the dataset's
+    # quantile sketches when they are available
+    with stage("soft_set_mapping"):
+        stat_values = compute_stat_values(filtered_data, available_mapping_rules, quantile_sketches)
+
+        # Create the mapped DataFrame
+        return build_soft_set(filtered_data, available_mapping_rules, stat_values)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def analyse_conflicts(data_key, attributes, _data, _quantile_sketches):
+    """Return the conflict summary of the ``attributes`` of a dataset.
+
+    Cached per dataset hash and attribute selection, so reruns (e.g. moving
+    the threshold slider) never recompute the mapping or the summary.
+    """
+    multi_soft_set_df = soft_set_of(attributes, _data, _quantile_sketches)
+
+    # Generate conflict summary from the per-attribute opinion counts
+    with stage("conflict_summary"):
+        return conflict_summary(multi_soft_set_df)
+
+@st.cache_data(max_entries=16, show_spinner=False)
+def analyse_pairwise_conflicts(data_key, attributes, _data, _quantile_sketches):
+    """Return the row-level alliance and conflict counts of every pair of ``attributes``."""
+    multi_soft_set_df = soft_set_of(attributes, _data, _quantile_sketches)
+    with stage("pairwise_conflicts"):
+        return pairwise_counts(multi_soft_set_df, multi_soft_set_df.columns)
+
+@st.fragment
+def conflict_graph(conflict_summary_cleaned):
+    # Only this fragment reruns when the threshold changes; the graph is
+    # rebuilt from the precomputed opinions at every certainty breakpoint
+    explore = st.toggle("Explore certainty thresholds")
+    if not explore:
+        with st.spinner("Generating report..."), stage("conflict_graph"):
+            st.image(render_conflict_graph(conflict_summary_cleaned, "Conflict Graph"))
+        return
+
+    structure = cached_threshold_structure(conflict_summary_cleaned)
+    threshold = st.slider("Certainty threshold", 0.0, 1.0, DEFAULT_CERTAINTY_THRESHOLD, 0.01)
+    attributes, alliances, conflicts = structure.edge_counts[['Attributes', 'Alliances', 'Conflicts']].to_numpy()[
+        breakpoint_index(structure, threshold)
+    ]
+    st.write(
+        f"{attributes} attributes, {alliances} alliances and {conflicts} conflicts "
+        f"at a certainty of at least {threshold:.2f}."
+    )
+    with st.expander("Graph size at every certainty breakpoint"):
+        st.dataframe(structure.edge_counts, hide_index=True)
+    with st.spinner("Generating report..."):
+        st.image(render_conflict_graph_at(structure, threshold))
+
+@st.fragment
+def pairwise_conflict_graph(data_key, attributes, data, quantile_sketches):
+    # Computed on demand: it is quadratic in the number of attributes
+    if not st.toggle("Show row-level alliances and conflicts"):
+        return
+
+    with st.spinner("Counting alliances and conflicts..."):
+        counts = analyse_pairwise_conflicts(data_key, attributes, data, quantile_sketches)
+    threshold = st.slider("Minimal degree", 0.0, 1.0, DEFAULT_DEGREE_THRESHOLD, 0.01)
+    max_edges = st.number_input("Maximum number of edges", 1, 50_000, MAX_EDGES, step=500)
+
+    edges = pairwise_edges(counts, threshold, max_edges)
+    st.write(f"{len(edges):,} edges between {len(counts.attributes)} attributes, "
+             f"over {counts.n_rows:,} rows.")
+    with st.expander("Strongest alliances and conflicts"):
+        st.dataframe(named_edges(counts, edges), hide_index=True)
+    with st.spinner("Generating report..."), stage("pairwise_graph"):
+        st.image(render_pairwise_graph(
+            counts, f"Row-level alliances and conflicts (degree >= {threshold:.2f})", threshold, max_edges
+        ))
+
+def interpretation_guide():
+    st.write("### How to Interpret the Conflict Graph")
+    st.markdown(
+    """
+    - **Nodes**: Each node represents an attribute from the dataset.
+      - The size and color of the nodes are uniform for visual clarity.
+    - **Edges**:
+      - <span style="color:red; font-weight:bold;">Solid Red Lines</span>: Represent <span style="color:red; font-weight:bold;">"Conflict"</span> between attributes with opposing opinions.
+      - <span style="color:green; font-weight:bold;">Dotted Green Lines</span>: Represent <span style="color:green; font-weight:bold;">"Alliance"</span> between attributes with similar opinions.
+    - **Threshold**: Only attributes with a certainty above the threshold (e.g., >= 0.39) are displayed.
+      Turn on "Explore certainty thresholds" to change it with a slider.
+    - Use the graph to explore relationships between attributes, identifying areas of tension or alignment.
+    """,
+    unsafe_allow_html=True
+)
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_precomputed_summary(content, name):
+    """Return the conflict summary stored in an uploaded file."""
+    return read_summary(io.BytesIO(content), name)
+
+def precomputed_conflict_analysis(summary_file):
+    try:
+        conflict_summary_cleaned = load_precomputed_summary(summary_file.getvalue(), summary_file.name)
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+        return
+
+    st.write("### Conflict Flow Visualization")
+    st.write(f"Precomputed Conflict Summary ({summary_file.name}):")
+    st.write(conflict_summary_cleaned)
+
+    interpretation_guide()
+    conflict_graph(conflict_summary_cleaned)
+
 def conflict_analysis():
-    if 'data' not in st.session_state or 'selected_attributes' not in st.session_state:
+    # Summaries of datasets too large to upload are computed offline, over
+    # all their partitions, by app/conflict_pipeline.py
+    with st.expander("Load a precomputed conflict summary"):
+        st.write(
+            "For datasets too large to upload, compute the summary over all their partitions with "
+            "`python app/conflict_pipeline.py <directory> --output summary.csv` and load it here."
+        )
+        summary_file = st.file_uploader("Conflict summary", type=["csv", "parquet"])
+    if summary_file:
+        st.header("Conflict Analysis")
+        precomputed_conflict_analysis(summary_file)
+        return
+
+    # The session only holds a reference into the process-wide dataset store
+    data = st.session_state['dataset'].get() if 'dataset' in st.session_state else None
+    if data is None or any(key not in st.session_state for key in ('data_key', 'selected_attributes')):
         st.warning("Please upload a dataset and select attributes first!")
         return
 
@@ -18,164 +154,40 @@ def conflict_analysis():
     st.write("### Conflict Flow Visualization")
 
     # Filter data based on selected attributes
-    filtered_data = st.session_state['data'][st.session_state['selected_attributes']]
+    filtered_data = data[st.session_state['selected_attributes']]
     st.write("Filtered Data for Analysis:")
     st.write(filtered_data.head())
 
-    # Define mapping rules
-    mapping_rules = {
-        'Attrition': {'low': 'No', 'high': 'Yes'},
-        'RelationshipSatisfaction': 'scale',
-        'WorkLifeBalance': 'scale',
-        'EnvironmentSatisfaction': 'scale',
-        'JobSatisfaction': 'scale',
-        'Education': 'scale',
-        'PerformanceRating': "scale",
-        'Age': 'balanced',
-        'MonthlyIncome': 'balanced',
-        'YearsAtCompany': 'balanced',
-        'OverTime': {'low': 'No', 'high': 'Yes'}
-    }
-
     # Filter mapping rules to include only available attributes
-    available_mapping_rules = {attr: rule for attr, rule in mapping_rules.items() if attr in filtered_data.columns}
+    available_mapping_rules = available_rules(filtered_data.columns, MAPPING_RULES)
     st.write(f"Available Mapping Rules: {list(available_mapping_rules.keys())}")
 
-    # Compute necessary statistics for 'balanced' rules
-    stat_values = {}
-    for attr, rule in available_mapping_rules.items():
-        if rule == 'balanced':
-            stat_values[attr] = {
-                'low_threshold': filtered_data[attr].quantile(0.4),
-                'high_threshold': filtered_data[attr].quantile(0.6)
-            }
-
-    def map_attribute(value, rule, stat_value=None):
-        if rule == 'scale':
-            return 1 if value >= 3 else 0 if value == 2 else -1
-        elif isinstance(rule, dict):
-            return 1 if value == rule['high'] else -1 if value == rule['low'] else 0
-        elif rule == 'balanced':
-            return 1 if value > stat_value['high_threshold'] else -1 if value < stat_value['low_threshold'] else 0
-
-    def map_values(row):
-        mapped_row = []
-        for attr, rule in available_mapping_rules.items():
-            if attr in row:
-                value = row[attr]
-                stat_value = stat_values.get(attr)
-                mapped_value = map_attribute(value, rule, stat_value)
-                mapped_row.append(mapped_value)
-        return tuple(mapped_row)
-
-    # Create the mapped DataFrame
-    mapped_data = filtered_data.apply(map_values, axis=1)
-    mapped_array = np.array(mapped_data.tolist())
-    multi_soft_set_df = pd.DataFrame(mapped_array, columns=available_mapping_rules.keys())
-
-    # st.write("Multi-Soft Set Representation:")
-    # st.write(multi_soft_set_df.head())
-
-    # Generate conflict summary
-    melted_df = multi_soft_set_df.melt(var_name='Attribute', value_name='Opinion')
-    conflict_summary = melted_df.groupby(['Attribute', 'Opinion']).size().reset_index(name='Support')
-    conflict_summary['Opinion'] = conflict_summary['Opinion'].replace({1: '+', 0: '0', -1: '-'})
-    
-    # Compute measures
-    total_support_opinion = conflict_summary.groupby('Opinion')['Support'].sum().rename("TotalOpinionSupport")
-    total_support_attribute = conflict_summary.groupby('Attribute')['Support'].sum().rename("TotalAttributeSupport")
-    conflict_summary = conflict_summary.merge(total_support_opinion, on='Opinion')
-    conflict_summary = conflict_summary.merge(total_support_attribute, on='Attribute')
-    conflict_summary['Coverage'] = conflict_summary['Support'] / conflict_summary['TotalOpinionSupport']
-    conflict_summary['Certainty'] = conflict_summary['Support'] / conflict_summary['TotalAttributeSupport']
-    conflict_summary['Strength'] = conflict_summary['Support'] / conflict_summary['Support'].sum()
-    
-    conflict_summary_cleaned = conflict_summary[['Attribute', 'Opinion', 'Support', 'Coverage', 'Certainty', 'Strength']]
+    conflict_summary_cleaned = analyse_conflicts(
+        st.session_state['data_key'], tuple(st.session_state['selected_attributes']),
+        data, st.session_state.get('quantile_sketches')
+    )
     st.write("Conflict Summary:")
     st.write(conflict_summary_cleaned)
 
-    # Visualization
-    def draw_conflict_graph(data, title):
-        # Filter the data based on the certainty threshold
-        with st.spinner("Generating report..."):
-            filtered_data = data[data['Certainty'] >= 0.39]
-
-            # Group attributes by their opinions
-            opinions = filtered_data.groupby('Attribute')['Opinion'].agg(lambda x: x.value_counts().idxmax())
-            positive_attributes = opinions[opinions == "+"].index.tolist()
-            negative_attributes = opinions[opinions == "-"].index.tolist()
-            neutral_attributes = opinions[opinions == "0"].index.tolist()
-
-            # Initialize the graph
-            G = nx.Graph()
-
-            # Add nodes for all attributes
-            for attribute in opinions.index:
-                G.add_node(attribute, size=2000, color='skyblue')
-
-            # Add alliance edges (dotted lines) for attributes with the same opinion (++ or --)
-            all_attributes = positive_attributes + negative_attributes
-            for i, attr1 in enumerate(all_attributes):
-                for attr2 in all_attributes[i + 1:]:
-                    if attr1 in positive_attributes and attr2 in positive_attributes:
-                        G.add_edge(attr1, attr2, style="dotted")
-                    elif attr1 in negative_attributes and attr2 in negative_attributes:
-                        G.add_edge(attr1, attr2, style="dotted")
-
-            # Add conflict edges (solid lines) for attributes with different opinions (+- or -+)
-            for pos_attr in positive_attributes:
-                for neg_attr in negative_attributes:
-                    G.add_edge(pos_attr, neg_attr, style="solid")
-
-            # Layout for nodes
-            pos = nx.circular_layout(G)
-
-            # Create a matplotlib figure
-            fig, ax = plt.subplots(figsize=(10,10))
-
-            # Draw nodes
-            nx.draw_networkx_nodes(
-                G, pos,
-                node_size=[2000 for _ in G.nodes()],  # Uniform node size
-                node_color=['skyblue' for _ in G.nodes()],  # Uniform node color
-                ax=ax
-            )
-
-            # Separate edges by type
-            solid_edges = [(u, v) for u, v, attr in G.edges(data=True) if attr["style"] == "solid"]
-            dotted_edges = [(u, v) for u, v, attr in G.edges(data=True) if attr["style"] == "dotted"]
-
-            # Draw edges
-            nx.draw_networkx_edges(G, pos, edgelist=solid_edges, style="solid", edge_color="red", width=2, ax=ax)
-            nx.draw_networkx_edges(G, pos, edgelist=dotted_edges, style="dotted", edge_color="green", width=2, ax=ax)
-
-            # Add labels to nodes
-            nx.draw_networkx_labels(G, pos, font_size=12, font_color="black", ax=ax)
-
-            # Set the title and hide axes
-            ax.set_title(title, fontsize=16)
-            ax.axis("off")
-
-            fig.savefig("images/draw_conflict_graph.png")
-
-            # Display the figure in Streamlit
-            image = Image.open('images/draw_conflict_graph.png')
-            st.image(image)
+    interpretation_guide()
 
-    st.write("### How to Interpret the Conflict Graph")
+    # Visualization (rendered in memory and cached by content)
+    conflict_graph(conflict_summary_cleaned)
+
+    st.write("### Row-level Alliances and Conflicts")
     st.markdown(
     """
-    - **Nodes**: Each node represents an attribute from the dataset.
-      - The size and color of the nodes are uniform for visual clarity.
-    - **Edges**:
-      - <span style="color:red; font-weight:bold;">Solid Red Lines</span>: Represent <span style="color:red; font-weight:bold;">"Conflict"</span> between attributes with opposing opinions.
-      - <span style="color:green; font-weight:bold;">Dotted Green Lines</span>: Represent <span style="color:green; font-weight:bold;">"Alliance"</span> between attributes with similar opinions.
-    - **Threshold**: Only attributes with a certainty above the threshold (e.g., >= 0.39) are displayed.
-    - Use the graph to explore relationships between attributes, identifying areas of tension or alignment.
-    """,
-    unsafe_allow_html=True
+    The graph above compares the majority opinions of the attributes. Below, every pair of attributes is
+    compared employee by employee instead: two attributes are **allied** in a row when they hold the same
+    positive or negative opinion, and in **conflict** when their opinions are opposite. The degree of an
+    edge is the share of rows in which the pair is allied (dotted green) or in conflict (solid red); only
+    the edges above the minimal degree are drawn.
+    """
 )
-
-    draw_conflict_graph(conflict_summary_cleaned, "Conflict Graph")
+    pairwise_conflict_graph(
+        st.session_state['data_key'], tuple(st.session_state['selected_attributes']),
+        data, st.session_state.get('quantile_sketches')
+    )
 
 conflict_analysis()
+finish_page()
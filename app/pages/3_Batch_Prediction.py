@@ -1,91 +1,190 @@
 import streamlit as st
 import pandas as pd
-import io
-from xgboost import XGBClassifier
-from joblib import load
-from sklearn.ensemble import GradientBoostingClassifier
+
+from core.batch import DEFAULT_CHUNK_SIZE, OutputFile, score_csv_in_chunks, score_frame
+from core.datasets import load_upload
+from core.ensemble import score_all_models
+from core.explanations import DEFAULT_TOP_K
+from core.exports import export_bytes, export_csv_file
+from core.features import FEATURE_COLUMNS
+from core.model_registry import get_compiled_model, get_model, is_available, model_names, model_path
+from core.perf import stage
+from export_panel import export_button
+from perf_panel import begin_page, finish_page
 
 st.set_page_config(layout="wide")
+begin_page("Batch Prediction")
+
 
-# Load models
-xgb_model = XGBClassifier()
-xgb_model.load_model('models/XGBoost.json')
+def scored_once(state_key, inputs, score):
+    """Return ``score()``, reusing the session's previous result while ``inputs`` are unchanged.
+
+    Reruns that only change the export format therefore re-serialise the
+    results without scoring the batch again. Only the latest result is kept.
+    """
+    cached = st.session_state.get(state_key)
+    if cached is None or cached[0] != inputs:
+        cached = (inputs, score())
+        st.session_state[state_key] = cached
+    return cached[1]
 
-models = {
-    "XGBoost (Recommended)": xgb_model,
-    "Random Forest": load('models/RandomForest.pkl'),
-    # "ADABoost": load('models/ada_clf_model.pkl'),
-    "Gradient Boosting": load('models/Gradient_Boosting.pkl')
-}
 
 # App title
 st.title("Attrition Prediction with Batch Processing")
 
-# Model selection
+# Model selection (models are loaded once per process, on first use)
 st.sidebar.header("Select a Model")
-selected_model_name = st.sidebar.selectbox("Choose a Model", list(models.keys()))
-selected_model = models[selected_model_name]
-
-# Preprocessing function for batch input
-def preprocess_batch(data):
-    # Ensure required columns are present
-    required_columns = [
-        "EmployeeNumber", "JobSatisfaction", "WorkLifeBalance", "EnvironmentSatisfaction",
-        "RelationshipSatisfaction", "Age", "MonthlyIncome", "YearsAtCompany", "OverTime",
-        "JobInvolvement", "Education", "PerformanceRating"
-    ]
-    missing_cols = [col for col in required_columns if col not in data.columns]
-    if missing_cols:
-        raise ValueError(f"The input file is missing required columns: {missing_cols}")
-    
-    # Convert OverTime to binary
-    data['OverTime'] = data['OverTime'].apply(lambda x: 1 if x == "Yes" else 0)
-    
-    # Keep EmployeeNumber separate for final output
-    employee_numbers = data['EmployeeNumber']
-    
-    # Select relevant features for the model
-    features = data[[
-        "JobSatisfaction", "WorkLifeBalance", "EnvironmentSatisfaction", "RelationshipSatisfaction",
-        "Age", "MonthlyIncome", "YearsAtCompany", "OverTime", "JobInvolvement", "Education", "PerformanceRating"
-    ]]
-    return employee_numbers, features
-
-# File upload for batch prediction
+selected_model_name = st.sidebar.selectbox("Choose a Model", model_names())
+
+# Streaming mode scores very large files chunk by chunk, comparison mode
+# scores the batch with every available model at once
+st.sidebar.header("Processing Mode")
+processing_mode = st.sidebar.radio(
+    "Choose a Mode", ["Selected model", "Compare all models", "Streaming (large files)"]
+)
+streaming_mode = processing_mode == "Streaming (large files)"
+compare_mode = processing_mode == "Compare all models"
+chunk_size = st.sidebar.number_input(
+    "Rows per chunk", min_value=1_000, max_value=5_000_000, value=DEFAULT_CHUNK_SIZE, step=10_000,
+    disabled=not streaming_mode
+)
+
+# Explanation mode adds the strongest drivers of every prediction to the results
+st.sidebar.header("Explanations")
+explain = st.sidebar.checkbox("Explain predictions", disabled=compare_mode)
+top_k = st.sidebar.number_input(
+    "Drivers per employee", min_value=1, max_value=len(FEATURE_COLUMNS), value=DEFAULT_TOP_K,
+    disabled=compare_mode or not explain
+)
+top_k = top_k if explain and not compare_mode else 0
+
+# The model itself (and its library) is only loaded once there is something to score
+if not compare_mode and not is_available(selected_model_name):
+    st.error(
+        f"The selected model is not available: the artifact for '{selected_model_name}' "
+        f"was not found at '{model_path(selected_model_name)}'."
+    )
+    finish_page()
+    st.stop()
+
 st.header("Batch Prediction")
-uploaded_file = st.file_uploader("Upload a CSV file for batch prediction", type=["csv"])
-
-if uploaded_file:
-    try:
-        # Read the uploaded file
-        input_data = pd.read_csv(uploaded_file)
-        
-        # Preprocess the data
-        employee_numbers, processed_data = preprocess_batch(input_data)
-        
-        # Predict attrition with handling for models without feature names
-        if isinstance(selected_model, GradientBoostingClassifier):
-            predictions = selected_model.predict(processed_data.to_numpy())  # Convert to NumPy array to avoid feature name issue
-        else:
-            predictions = selected_model.predict(processed_data)
-        
-        # Add predictions to the results
-        results = pd.DataFrame({
-            "EmployeeNumber": employee_numbers,
-            "Predicted_Attrition": ["Yes" if pred == 1 else "No" for pred in predictions]
-        })
-
-        # Display results
-        st.write("Batch Prediction Results:")
-        st.dataframe(results)
-
-        # Provide download link for the result
-        output_csv = results.to_csv(index=False)
-        st.download_button(
-            label="Download Prediction Results as CSV",
-            data=io.StringIO(output_csv).getvalue(),
-            file_name="attrition_predictions.csv",
-            mime="text/csv"
+
+if streaming_mode:
+    st.write(
+        "Streaming mode reads the input in chunks and appends the predictions to a file on disk, "
+        "so memory use depends on the chunk size rather than the file size."
+    )
+    uploaded_file = st.file_uploader("Upload a CSV file for batch prediction", type=["csv"])
+
+    if st.button("Run Streaming Prediction", disabled=not uploaded_file):
+        # Discard the results of the previous run
+        previous_output = st.session_state.pop('streaming_output', None)
+        if previous_output is not None:
+            previous_output.remove()
+
+        # Removed with the session state when the session ends
+        output = OutputFile()
+        progress_bar = st.progress(0.0, text="Scoring...")
+
+        def report_progress(rows, fraction):
+            if fraction is None:
+                progress_bar.progress(0.0, text=f"Scored {rows:,} rows")
+            else:
+                progress_bar.progress(fraction, text=f"Scored {rows:,} rows ({fraction:.0%})")
+
+        try:
+            with stage("streaming_scoring"):
+                selected_model = get_model(selected_model_name)
+                compiled_model = get_compiled_model(selected_model_name) if top_k else None
+                rows = score_csv_in_chunks(
+                    uploaded_file, selected_model, output.path, chunksize=chunk_size,
+                    total_bytes=uploaded_file.size, progress=report_progress,
+                    top_k=top_k, compiled_model=compiled_model
+                )
+            progress_bar.progress(1.0, text=f"Scored {rows:,} rows")
+            st.session_state['streaming_output'] = output
+        except Exception as e:
+            output.remove()
+            st.error(f"An error occurred: {e}")
+
+    output = st.session_state.get('streaming_output')
+    if output is not None and output.exists():
+        output_path = output.path
+        st.write("Batch Prediction Results (first 1,000 rows):")
+        st.dataframe(pd.read_csv(output_path, nrows=1_000))
+
+        # Read back from disk only when the download is requested
+        export_button(
+            "Download Prediction Results", lambda fmt: export_csv_file(output_path, fmt),
+            "attrition_predictions", key="streaming_download"
         )
-    except Exception as e:
-        st.error(f"An error occurred: {e}")
+
+elif compare_mode:
+    st.write(
+        "Every available model scores the uploaded batch in parallel. The output combines the "
+        "per-model predictions with majority-vote and soft-vote ensembles."
+    )
+    uploaded_file = st.file_uploader("Upload a CSV file for batch prediction", type=["csv"])
+
+    if uploaded_file:
+        try:
+            with stage("load_upload"):
+                data_key, input_data = load_upload(uploaded_file, st.session_state)
+            with st.spinner("Scoring with every available model..."), stage("score_all_models"):
+                ensemble = scored_once("compare_results", data_key, lambda: score_all_models(input_data))
+
+            st.write("Batch Prediction Results:")
+            st.dataframe(ensemble.results)
+
+            st.write("### Model Comparison")
+            st.write(f"Scored {len(ensemble.results):,} rows with {len(ensemble.model_stats)} models "
+                     f"in {ensemble.wall_time:.2f} seconds.")
+            st.dataframe(ensemble.model_stats)
+            st.write("Pairwise agreement between models:")
+            st.dataframe(ensemble.pairwise_agreement)
+
+            results = ensemble.results
+            export_button(
+                "Download Prediction Results", lambda fmt: export_bytes(results, fmt),
+                "attrition_predictions_all_models", key="compare_download"
+            )
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+
+else:
+    # File upload for batch prediction
+    if top_k:
+        st.write(
+            f"Every prediction comes with its {top_k} strongest drivers: the features that moved the "
+            "employee's attrition score the most, with their contribution in log-odds (positive values "
+            "push towards attrition)."
+        )
+    uploaded_file = st.file_uploader("Upload a CSV file for batch prediction", type=["csv"])
+
+    if uploaded_file:
+        try:
+            # Read the uploaded file (parsed once per distinct content)
+            with stage("load_upload"):
+                data_key, input_data = load_upload(uploaded_file, st.session_state)
+
+            # Preprocess the data and predict attrition, once per upload, model and drivers
+            def score():
+                compiled_model = get_compiled_model(selected_model_name) if top_k else None
+                return score_frame(get_model(selected_model_name), input_data, top_k, compiled_model)
+
+            with stage("score_frame"):
+                results = scored_once("batch_results", (data_key, selected_model_name, top_k), score)
+
+            # Display results
+            st.write("Batch Prediction Results:")
+            st.dataframe(results)
+
+            # Provide download link for the result, built only when clicked
+            export_button(
+                "Download Prediction Results", lambda fmt: export_bytes(results, fmt),
+                "attrition_predictions", key="batch_download"
+            )
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+
+finish_page()
@@ -1,39 +1,36 @@
 import streamlit as st
 import pandas as pd
-import os
-from xgboost import XGBClassifier
-from joblib import load
 
-# Define the path to the models directory
-models_dir = "models"
+from core.batch import predict, predict_proba
+from core.features import FEATURE_COLUMNS, record_features
+from core.model_registry import RECOMMENDED_MODEL, ModelNotAvailableError, get_compiled_model, get_model, model_names
+from core.perf import stage
+from core.prediction_cache import prediction_cache, warm_grid
+from perf_panel import begin_page, finish_page
 
-# Check if the directory exists
-if not os.path.exists(models_dir):
-    raise FileNotFoundError(f"The models directory '{models_dir}' does not exist.")
-
-# Load XGBoost model
-xgb_model = XGBClassifier()
-xgb_model.load_model('models/XGBoost.json')
-
-models = {
-    "XGBoost (Recommended)": xgb_model,
-    "Random Forest": load('models/RandomForest.pkl'),
-    # "ADABoost": load('models/ada_clf_model.pkl'),
-    "Gradient Boosting": load('models/Gradient_Boosting.pkl')
+# Values of the discrete inputs, used to precompute the what-if grid
+WHAT_IF_GRID = {
+    "JobSatisfaction": range(1, 5),
+    "WorkLifeBalance": range(1, 5),
+    "EnvironmentSatisfaction": range(1, 5),
+    "RelationshipSatisfaction": range(1, 5),
+    "OverTime": (0, 1),
+    "JobInvolvement": range(1, 5),
+    "Education": range(1, 5),
+    "PerformanceRating": range(1, 5)
 }
-model_names = ["XGBoost (Recommended)", "Random Forest", "Gradient Boosting"]
 
 # App Title and Header
 st.set_page_config(layout="wide", page_title="Attrition Prediction")
+begin_page("Individual Prediction")
 st.title("Employee Attrition Prediction")
 st.subheader("Analyze employee attrition using machine learning models")
 
 # Model Selection (Toggle Switch)
 st.markdown("### Select a Model")
-model_options = ["XGBoost (Recommended)", "Random Forest", "Gradient Boosting"]
+model_options = model_names()
 selected_model_index = st.radio("Choose a Model", range(len(model_options)), format_func=lambda x: model_options[x], horizontal=True)
 selected_model_name = model_options[selected_model_index]
-selected_model = models[selected_model_name]
 
 # Input Features in Main Content
 st.markdown("## Input Features")
@@ -50,47 +47,76 @@ job_involvement = st.slider("Job Involvement (1-4)", 1, 4, 3)
 education = st.slider("Education (1-4)", 1, 4, 3)
 performance_rating = st.slider("Performance Rating (1-4)", 1, 4, 3)
 
-# Preprocessing function
-def preprocess_input(data):
-    data['OverTime'] = data['OverTime'].apply(lambda x: 1 if x == "Yes" else 0)
-    columns = [
-        "JobSatisfaction", "WorkLifeBalance", "EnvironmentSatisfaction", "RelationshipSatisfaction",
-        "Age", "MonthlyIncome", "YearsAtCompany", "OverTime", "JobInvolvement", "Education", "PerformanceRating"
-    ]
-    return data[columns]
-
 # Prepare input data
-input_data = pd.DataFrame({
-    "JobSatisfaction": [job_satisfaction],
-    "WorkLifeBalance": [work_life_balance],
-    "EnvironmentSatisfaction": [environment_satisfaction],
-    "Age": [age],
-    "MonthlyIncome": [monthly_income],
-    "YearsAtCompany": [years_at_company],
-    "OverTime": [overtime],
-    "RelationshipSatisfaction": [relationship_satisfaction],
-    "JobInvolvement": [job_involvement],
-    "Education": [education],
-    "PerformanceRating": [performance_rating]
-})
+input_values = {
+    "JobSatisfaction": job_satisfaction,
+    "WorkLifeBalance": work_life_balance,
+    "EnvironmentSatisfaction": environment_satisfaction,
+    "Age": age,
+    "MonthlyIncome": monthly_income,
+    "YearsAtCompany": years_at_company,
+    "OverTime": overtime,
+    "RelationshipSatisfaction": relationship_satisfaction,
+    "JobInvolvement": job_involvement,
+    "Education": education,
+    "PerformanceRating": performance_rating
+}
+input_data = pd.DataFrame({col: [value] for col, value in input_values.items()})
 
-processed_data = preprocess_input(input_data)
+# float32 feature vector in model order, shared by every model
+feature_vector = record_features(input_values)
 
 # Prediction and Results
 st.markdown("## Prediction Results")
 if st.button("Predict Attrition"):
     try:
-        # Convert to NumPy array if model was trained without feature names
-        if selected_model_name in ["Random Forest", "ADABoost", "Gradient Boosting"]:
-            prediction = selected_model.predict(processed_data.to_numpy())[0]
-        else:
-            prediction = selected_model.predict(processed_data)[0]
-        
+        def compute_prediction():
+            # Tree ensembles are scored from flat node tables, skipping the
+            # estimator overhead; other models fall back to the estimator
+            compiled_model = get_compiled_model(selected_model_name)
+            if compiled_model is not None:
+                probability = compiled_model.predict_proba(feature_vector)[0]
+                return int(compiled_model.predict(feature_vector)[0]), float(probability)
+
+            selected_model = get_model(selected_model_name)
+            prediction = predict(selected_model, feature_vector)[0]
+            probability = predict_proba(selected_model, feature_vector)[0]
+            return int(prediction), float(probability)
+
+        # Repeated profiles are answered from the process-wide cache
+        with stage("predict"):
+            prediction, probability = prediction_cache.get_or_compute(
+                selected_model_name, feature_vector, compute_prediction
+            )
+
         result = "Yes" if prediction == 1 else "No"
         st.metric(label="Predicted Attrition", value=result)
+        st.write(f"Probability of attrition: {probability:.1%}")
+    except ModelNotAvailableError as e:
+        st.error(f"The selected model is not available: {e}")
     except Exception as e:
         st.error(f"An error occurred during prediction: {str(e)}")
 
+# Prediction cache
+with st.sidebar.expander("Prediction Cache"):
+    st.write(
+        "Predictions are cached across sessions. Precomputing the what-if grid scores every "
+        "combination of the 1-4 sliders and OverTime for the current age, income and tenure."
+    )
+    if st.button("Precompute What-If Grid"):
+        try:
+            # None when the model cannot be compiled: the grid is then scored by the estimator
+            compiled_model = get_compiled_model(RECOMMENDED_MODEL)
+            with st.spinner("Scoring the what-if grid..."), stage("what_if_grid"):
+                grid_levels = {FEATURE_COLUMNS.index(col): levels for col, levels in WHAT_IF_GRID.items()}
+                n_points = warm_grid(prediction_cache, RECOMMENDED_MODEL, compiled_model, feature_vector, grid_levels)
+            st.success(f"Cached {n_points:,} predictions for {RECOMMENDED_MODEL}.")
+        except ModelNotAvailableError as e:
+            st.error(f"The recommended model is not available: {e}")
+    st.write(prediction_cache.stats())
+
 # Display Input Summary
 st.markdown("### Input Summary")
 st.write(input_data)
+
+finish_page()
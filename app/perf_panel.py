@@ -0,0 +1,57 @@
+"""Per-rerun performance panel shown in the sidebar of every page.
+
+Pages call ``begin_page`` right after ``st.set_page_config`` and
+``finish_page`` at the end of the script (and before ``st.stop``). The
+timings are only measured and shown when instrumentation is enabled with
+``ATTRITION_PERF`` (see ``core.perf``); the statistics of the shared dataset
+store are always shown.
+"""
+import streamlit as st
+
+from core import perf
+from core.artifact_store import get_store
+
+
+def begin_page(page):
+    """Start measuring the current rerun of ``page``."""
+    perf.begin_run(page)
+
+
+def finish_page():
+    """Finish the current run, write its trace and show its stages and the store statistics in the sidebar."""
+    run = perf.end_run()
+    if run is not None:
+        _show_run(run)
+    _show_store_stats()
+
+
+def _show_run(run):
+    with st.sidebar.expander("Performance", expanded=False):
+        st.write(f"This rerun took **{run.total_ms:,.1f} ms**.")
+        rows = [
+            {
+                "Stage": "\u2003" * stage["depth"] + stage["name"].rsplit("/", 1)[-1],
+                "Time (ms)": round(stage.get("ms", float("nan")), 2),
+                **({"Peak memory (MiB)": round(stage["peak_mb"], 2)} if "peak_mb" in stage else {})
+            }
+            for stage in run.stages
+        ]
+        if rows:
+            st.dataframe(rows, hide_index=True)
+        else:
+            st.write("No instrumented stage ran.")
+        peak_rss = perf.peak_rss_mb()
+        if peak_rss is not None:
+            st.caption(f"Process peak memory: {peak_rss:,.0f} MiB. Traces: {perf.trace_path()}")
+
+
+def _show_store_stats():
+    stats = get_store().stats()
+    hit_rate = "n/a" if stats["hit_rate"] is None else f"{stats['hit_rate']:.0%}"
+    with st.sidebar.expander("Dataset store", expanded=False):
+        st.caption(
+            f"{stats['entries']} entries ({stats['references']} session references), "
+            f"{stats['resident_bytes'] / 2 ** 20:,.1f} of {stats['budget_bytes'] / 2 ** 20:,.0f} MiB resident, "
+            f"{stats['spilled_bytes'] / 2 ** 20:,.1f} MiB spilled, hit rate {hit_rate}, "
+            f"{stats['evictions']} evictions."
+        )
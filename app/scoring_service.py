@@ -0,0 +1,199 @@
+"""Headless HTTP scoring service for integrations such as the HRIS.
+
+Scores employees with the same model artifacts and feature pipeline as the
+Batch Prediction page, without Streamlit. Concurrent single-employee requests
+are grouped into micro-batches (see ``core.micro_batching``) before the model
+is called, so the per-call overhead of the model is shared by the batch.
+
+Endpoints:
+
+* ``POST /predict`` with one employee as a JSON object holding the
+  ``core.features.FEATURE_COLUMNS`` (``OverTime`` as "Yes"/"No"), and optionally an
+  ``EmployeeNumber``; a JSON list of employees is also accepted. Returns
+  ``Predicted_Attrition`` ("Yes"/"No") and ``Probability`` per employee.
+* ``GET /stats``: throughput, latency percentiles and batch sizes.
+* ``GET /health``
+
+Usage:
+    python app/scoring_service.py --port 8600 --max-batch-size 64 --max-wait-ms 5
+"""
+import argparse
+import json
+import sys
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from core.batch import predict, predict_proba, to_labels
+from core.features import record_features
+from core.micro_batching import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_WAIT, MicroBatcher
+from core.model_registry import RECOMMENDED_MODEL, ModelNotAvailableError, get_compiled_model, get_model, model_names
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8600
+
+# Seconds a request waits for its batch to be scored
+REQUEST_TIMEOUT = 30
+
+# Largest accepted request body
+MAX_BODY_BYTES = 1 << 20
+
+
+def make_batch_scorer(model_name, compiled=True):
+    """Return a function scoring a feature matrix with the model ``model_name``.
+
+    Tree ensembles are scored from their compiled node tables unless
+    ``compiled`` is false. The model is looked up on every batch, so a
+    retrained artifact is picked up without restarting the service.
+    """
+    def score_batch(matrix):
+        compiled_model = get_compiled_model(model_name) if compiled else None
+        if compiled_model is not None:
+            predictions = compiled_model.predict(matrix)
+            probabilities = compiled_model.predict_proba(matrix)
+        else:
+            model = get_model(model_name)
+            predictions = predict(model, matrix)
+            probabilities = predict_proba(model, matrix)
+        return [
+            {"Predicted_Attrition": label, "Probability": float(probability)}
+            for label, probability in zip(to_labels(predictions), probabilities)
+        ]
+    return score_batch
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Many HRIS clients may connect at once
+    request_queue_size = 128
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Small responses on keep-alive connections must not wait for delayed ACKs
+    disable_nagle_algorithm = True
+
+    # Set on the server by ``make_server``
+    @property
+    def batcher(self):
+        return self.server.batcher
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(HTTPStatus.OK, {"status": "ok", "model": self.server.model_name})
+        elif self.path == "/stats":
+            stats = self.batcher.stats.snapshot()
+            stats.update(model=self.server.model_name, max_batch_size=self.batcher.max_batch_size,
+                         max_wait_ms=self.batcher.max_wait * 1000)
+            self._send_json(HTTPStatus.OK, stats)
+        else:
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint {self.path}"})
+
+    def _content_length(self):
+        # The declared body length, or None unless it is a plain non-negative integer
+        value = self.headers.get("Content-Length", "0").strip()
+        if not (value.isascii() and value.isdigit()):
+            return None
+        return int(value)
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown endpoint {self.path}"})
+            return
+
+        length = self._content_length()
+        if length is None:
+            # Where the body ends is unknown: answer before reading it and drop the connection
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length header."})
+            self.close_connection = True
+            return
+        if length > MAX_BODY_BYTES:
+            self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large."})
+            self.close_connection = True
+            return
+        try:
+            payload = json.loads(self.rfile.read(length))
+            records = payload if isinstance(payload, list) else [payload]
+            rows = [record_features(record) for record in records]
+        except ValueError as e:
+            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+            return
+
+        try:
+            futures = [self.batcher.submit(row) for row in rows]
+            results = [future.result(timeout=REQUEST_TIMEOUT) for future in futures]
+        except ModelNotAvailableError as e:
+            self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": f"The model is not available: {e}"})
+            return
+        except Exception as e:
+            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"An error occurred during prediction: {e}"})
+            return
+
+        results = [
+            {"EmployeeNumber": record["EmployeeNumber"], **result} if "EmployeeNumber" in record else result
+            for record, result in zip(records, results)
+        ]
+        self._send_json(HTTPStatus.OK, results if isinstance(payload, list) else results[0])
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, model_name=RECOMMENDED_MODEL,
+                max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT, compiled=True, verbose=False):
+    """Return a scoring server, ready to ``serve_forever``."""
+    # Load the model up front, so a missing artifact fails at startup
+    if compiled:
+        get_compiled_model(model_name)
+    else:
+        get_model(model_name)
+
+    server = ScoringServer((host, port), ScoringRequestHandler)
+    server.model_name = model_name
+    server.verbose = verbose
+    server.batcher = MicroBatcher(make_batch_scorer(model_name, compiled), max_batch_size, max_wait)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve attrition predictions over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--model", default=RECOMMENDED_MODEL, choices=model_names())
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE,
+                        help=f"largest micro-batch (default: {DEFAULT_MAX_BATCH_SIZE})")
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT * 1000,
+                        help=f"longest wait for a micro-batch to fill (default: {DEFAULT_MAX_WAIT * 1000:g})")
+    parser.add_argument("--no-compile", action="store_true",
+                        help="score with the estimator instead of the compiled trees")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    try:
+        server = make_server(args.host, args.port, args.model, args.max_batch_size, args.max_wait_ms / 1000,
+                             not args.no_compile, args.verbose)
+    except ModelNotAvailableError as e:
+        print(f"The selected model is not available: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Scoring with {args.model} on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
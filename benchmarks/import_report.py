@@ -0,0 +1,102 @@
+"""Startup import-time report of the Streamlit pages.
+
+Every page is run once, headless and before any data is uploaded (i.e. its
+first paint), in a fresh interpreter started with ``-X importtime``. The
+imports triggered by the page, excluding those of Streamlit's test harness,
+are grouped by top-level package and reported with the wall time of the run.
+
+Usage:
+    python benchmarks/import_report.py [--top 10] [--json startup.json]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+APP_DIR = REPO_DIR / "app"
+PAGES = [APP_DIR / "Intro.py"] + sorted((APP_DIR / "pages").glob("*.py"))
+
+# Written to stderr between the harness imports and the page's own
+MARKER = "--- page start ---"
+
+RUNNER = f"""
+import sys, time, warnings
+warnings.filterwarnings("ignore")
+from streamlit.testing.v1 import AppTest
+app = AppTest.from_file(sys.argv[1], default_timeout=600)
+print({MARKER!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+app.run()
+print(f"wall_time_s={{time.perf_counter() - start}}", file=sys.stderr, flush=True)
+if app.exception:
+    print("exception=" + app.exception[0].value, file=sys.stderr, flush=True)
+"""
+
+
+def parse_importtime(lines):
+    """Return ``{top-level package: cumulative seconds}`` from ``-X importtime`` lines."""
+    totals = defaultdict(float)
+    for line in lines:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue  # Header line
+        # Nested imports are indented; only the outermost one counts, since
+        # its cumulative time includes them
+        if name.startswith("  ") and name[2:3] == " ":
+            continue
+        totals[name.strip().split(".")[0]] += int(cumulative) / 1e6
+    return dict(totals)
+
+
+def profile_page(page):
+    env = dict(os.environ, PYTHONPATH=str(APP_DIR))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", RUNNER, str(page)],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True
+    )
+    lines = process.stderr.splitlines()
+    if MARKER not in lines:
+        raise RuntimeError(f"{page.name} failed to start:\n{process.stderr[-2000:]}")
+    page_lines = lines[lines.index(MARKER) + 1:]
+
+    report = {"page": page.name, "imports": parse_importtime(page_lines)}
+    for line in page_lines:
+        if line.startswith("wall_time_s="):
+            report["wall_time_s"] = float(line.split("=", 1)[1])
+        elif line.startswith("exception="):
+            report["exception"] = line.split("=", 1)[1]
+    report["import_time_s"] = sum(report["imports"].values())
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the import time of every page's first paint.")
+    parser.add_argument("--top", type=int, default=10, help="packages listed per page (default: 10)")
+    parser.add_argument("--json", type=Path, help="also write the full report to this file")
+    args = parser.parse_args()
+
+    reports = []
+    for page in PAGES:
+        report = profile_page(page)
+        reports.append(report)
+        print(f"{report['page']}: first paint {report.get('wall_time_s', float('nan')):.2f} s, "
+              f"of which imports {report['import_time_s']:.2f} s")
+        if "exception" in report:
+            print(f"  exception: {report['exception']}")
+        ranked = sorted(report["imports"].items(), key=lambda item: -item[1])
+        for package, seconds in ranked[:args.top]:
+            print(f"  {package:<24} {seconds * 1000:9.1f} ms")
+
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
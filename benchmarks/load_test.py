@@ -0,0 +1,111 @@
+"""Load generator for the headless scoring service.
+
+Sends single-employee ``POST /predict`` requests from concurrent clients,
+each over its own keep-alive connection, then prints the client-side
+throughput and latency percentiles next to the service's own ``/stats``.
+
+Usage:
+    python app/scoring_service.py &
+    python benchmarks/load_test.py --clients 32 --requests 20000
+"""
+import argparse
+import http.client
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import numpy as np
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent / "app"))
+
+from core.features import FEATURE_COLUMNS  # noqa: E402
+from core.micro_batching import PERCENTILES  # noqa: E402
+from synthetic import generate_hr_dataset  # noqa: E402
+
+DEFAULT_URL = "http://127.0.0.1:8600"
+
+# Distinct employees cycled through by the clients
+DISTINCT_EMPLOYEES = 10_000
+
+
+def employee_payloads(n, seed=0):
+    """Return ``n`` encoded single-employee request bodies."""
+    data = generate_hr_dataset(n, seed)[["EmployeeNumber"] + FEATURE_COLUMNS]
+    return [json.dumps(record).encode("utf-8") for record in data.to_dict(orient="records")]
+
+
+def _client(url, payloads, n_requests, latencies, errors):
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+    headers = {"Content-Type": "application/json"}
+    try:
+        for i in range(n_requests):
+            start = time.perf_counter()
+            connection.request("POST", "/predict", body=payloads[i % len(payloads)], headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status == 200:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors.append(response.status)
+    except OSError as e:
+        errors.append(str(e))
+    finally:
+        connection.close()
+
+
+def run_load(url, clients, n_requests, seed=0):
+    """Send ``n_requests`` spread over ``clients`` threads; return the client-side statistics."""
+    payloads = employee_payloads(min(n_requests, DISTINCT_EMPLOYEES), seed)
+    latencies, errors = [], []
+    per_client = [n_requests // clients + (i < n_requests % clients) for i in range(clients)]
+    threads = [
+        threading.Thread(target=_client, args=(url, payloads[i::clients] or payloads, n, latencies, errors))
+        for i, n in enumerate(per_client)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    stats = {"requests": len(latencies), "errors": len(errors), "elapsed_s": elapsed,
+             "throughput_rps": len(latencies) / elapsed}
+    values = np.percentile(np.array(latencies) * 1000, PERCENTILES) if latencies else np.zeros(len(PERCENTILES))
+    for p, value in zip(PERCENTILES, values):
+        stats[f"latency_p{p}_ms"] = float(value)
+    if errors:
+        stats["first_error"] = errors[0]
+    return stats
+
+
+def service_stats(url):
+    connection = http.client.HTTPConnection(url.hostname, url.port, timeout=10)
+    try:
+        connection.request("GET", "/stats")
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the scoring service.")
+    parser.add_argument("--url", default=DEFAULT_URL, help=f"service URL (default: {DEFAULT_URL})")
+    parser.add_argument("--clients", type=int, default=16, help="concurrent clients (default: 16)")
+    parser.add_argument("--requests", type=int, default=10_000, help="total requests (default: 10000)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    client = run_load(url, args.clients, args.requests, args.seed)
+    print(json.dumps({"client": client, "service": service_stats(url)}, indent=2))
+    return 1 if client["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""Headless benchmarks of the core stages behind the Streamlit pages.
+
+Every stage is run on synthetic IBM HR shaped datasets of increasing size
+(see ``synthetic.py``). The wall time is the median of ``--repeat`` runs;
+the peak memory is measured with ``tracemalloc`` in a separate run, so that
+tracing does not inflate the timings.
+
+Results are written as JSON and compared with a baseline: any stage slower
+or heavier than the baseline by more than the tolerance is reported as a
+regression and the script exits with status 1.
+
+``benchmarks/baseline.json`` is the committed reference baseline, recorded
+with the default sizes and stages on a reference machine (its
+``environment`` section says which). Timings only compare on the same kind
+of machine, so regenerate it on the machine that runs the comparison (e.g.
+the CI runner) with ``--save-baseline``, and commit it again whenever a
+change is expected to move the numbers. With ``--ci`` a missing baseline is
+an error (status 2) instead of a skipped comparison.
+
+Usage:
+    python benchmarks/run.py                                 # default sizes
+    python benchmarks/run.py --sizes 1k,10k,1m,10m --stages mapping,summary
+    python benchmarks/run.py --save-baseline                 # record this machine's baseline
+    python benchmarks/run.py --baseline benchmarks/baseline.json
+    python benchmarks/run.py --ci                            # fail without a baseline
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCHMARKS_DIR.parent / "app"))
+
+from core.batch import predict, preprocess_batch  # noqa: E402
+from core.conflict_graph import build_conflict_graph  # noqa: E402
+from core.explanations import feature_contributions, top_drivers  # noqa: E402
+from core.features import FEATURE_COLUMNS, record_features  # noqa: E402
+from core.model_registry import RECOMMENDED_MODEL, get_model, is_available  # noqa: E402
+from core.pairwise_conflicts import pairwise_counts  # noqa: E402
+from core.quantiles import sketch_columns  # noqa: E402
+from core.soft_set import (  # noqa: E402
+    MAPPING_RULES, available_rules, balanced_attributes, compute_stat_values, conflict_summary_from_counts,
+    map_soft_set, opinion_counts
+)
+from core.tree_compiler import compile_model  # noqa: E402
+from synthetic import generate_hr_dataset  # noqa: E402
+
+DEFAULT_SIZES = "1k,10k,100k,1m"
+DEFAULT_RESULTS = BENCHMARKS_DIR / "results.json"
+DEFAULT_BASELINE = BENCHMARKS_DIR / "baseline.json"
+
+# Relative slowdown (or memory growth) above which a stage is a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Timings shorter than this are too noisy to be compared
+MIN_COMPARED_SECONDS = 0.005
+
+# Single-employee calls timed per run of the record_features stage, enough
+# for the run to last longer than MIN_COMPARED_SECONDS
+SINGLE_ROW_CALLS = 5_000
+
+
+def parse_size(text):
+    """Parse a row count such as ``10k`` or ``1m``."""
+    text = text.strip().lower()
+    multiplier = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * multiplier)
+
+
+def _conflict_inputs(data):
+    rules = available_rules(data.columns, MAPPING_RULES)
+    return rules, compute_stat_values(data, rules)
+
+
+def stage_mapping(data, model):
+    rules = available_rules(data.columns, MAPPING_RULES)
+    return lambda: map_soft_set(data, rules, compute_stat_values(data, rules))
+
+
+def stage_summary(data, model):
+    rules, stat_values = _conflict_inputs(data)
+    mapped = map_soft_set(data, rules, stat_values)
+    return lambda: conflict_summary_from_counts(list(rules), opinion_counts(mapped))
+
+
+def stage_graph(data, model):
+    rules, stat_values = _conflict_inputs(data)
+    summary = conflict_summary_from_counts(list(rules), opinion_counts(map_soft_set(data, rules, stat_values)))
+    return lambda: build_conflict_graph(summary)
+
+
+def stage_pairwise(data, model):
+    rules, stat_values = _conflict_inputs(data)
+    mapped = map_soft_set(data, rules, stat_values)
+    return lambda: pairwise_counts(mapped, list(rules))
+
+
+def stage_sketches(data, model):
+    columns = balanced_attributes(MAPPING_RULES)
+    return lambda: sketch_columns(data, columns)
+
+
+def stage_preprocess_batch(data, model):
+    return lambda: preprocess_batch(data)
+
+
+def stage_predict(data, model):
+    _, features = preprocess_batch(data)
+    return lambda: predict(model, features)
+
+
+def stage_explain(data, model):
+    _, features = preprocess_batch(data)
+    # Only the scikit-learn ensembles are explained from their compiled trees
+    compiled_model = None if type(model).__module__.startswith("xgboost") else compile_model(model)
+    return lambda: top_drivers(feature_contributions(model, features, compiled_model))
+
+
+def stage_record_features(data, model):
+    # The individual prediction page and the scoring service build the
+    # features of one employee at a time; the dataset size only sets how many
+    # distinct records are cycled through
+    records = data.iloc[:SINGLE_ROW_CALLS].to_dict("records")
+
+    def run():
+        for i in range(SINGLE_ROW_CALLS):
+            record_features(records[i % len(records)])
+    return run
+
+
+# name: (setup, needs a model, description)
+STAGES = {
+    "mapping": (stage_mapping, False, "soft-set thresholds and mapping (Conflict Analysis)"),
+    "summary": (stage_summary, False, "conflict summary from the mapping (Conflict Analysis)"),
+    "graph": (stage_graph, False, "conflict graph construction (Conflict Analysis)"),
+    "pairwise": (stage_pairwise, False, "row-level pairwise alliances and conflicts (Conflict Analysis)"),
+    "sketches": (stage_sketches, False, "quantile sketches of the balanced attributes (upload)"),
+    "preprocess_batch": (stage_preprocess_batch, False, "batch preprocessing (Batch Prediction)"),
+    "predict": (stage_predict, True, "model predictions (Batch Prediction)"),
+    "explain": (stage_explain, True, "feature contributions and top drivers (Batch Prediction)"),
+    "record_features": (stage_record_features, False,
+                        f"{SINGLE_ROW_CALLS} single-employee feature vectors (Individual Prediction, scoring service)")
+}
+
+
+def measure(run, repeat):
+    """Return ``(median wall time, min wall time, peak traced memory)`` of ``run``."""
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), min(timings), peak
+
+
+def run_benchmarks(sizes, stages, model_name, repeat, seed, log=print):
+    model = None
+    if any(STAGES[stage][1] for stage in stages):
+        if is_available(model_name):
+            model = get_model(model_name)
+        else:
+            log(f"Model {model_name!r} is not available, skipping the model stages")
+            stages = [stage for stage in stages if not STAGES[stage][1]]
+
+    results = []
+    for n_rows in sizes:
+        data = generate_hr_dataset(n_rows, seed)
+        for stage in stages:
+            setup, _, _ = STAGES[stage]
+            median, fastest, peak = measure(setup(data, model), repeat)
+            results.append({
+                "stage": stage,
+                "rows": n_rows,
+                "wall_time_s": median,
+                "min_wall_time_s": fastest,
+                "peak_memory_bytes": peak
+            })
+            log(f"{stage:>18} {n_rows:>11,} rows  {median * 1000:10.2f} ms  {peak / 2 ** 20:9.1f} MiB")
+        del data
+    return results
+
+
+def environment(model_name):
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "model": model_name,
+        "features": FEATURE_COLUMNS
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return the regressions of ``results`` with respect to ``baseline``, as messages."""
+    reference = {(r["stage"], r["rows"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        base = reference.get((result["stage"], result["rows"]))
+        if base is None:
+            continue
+        label = f"{result['stage']} on {result['rows']:,} rows"
+        if base["wall_time_s"] >= MIN_COMPARED_SECONDS:
+            ratio = result["wall_time_s"] / base["wall_time_s"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{label}: {result['wall_time_s'] * 1000:.2f} ms vs {base['wall_time_s'] * 1000:.2f} ms "
+                    f"(x{ratio:.2f})"
+                )
+        if base["peak_memory_bytes"] > 0:
+            ratio = result["peak_memory_bytes"] / base["peak_memory_bytes"]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{label}: peak memory {result['peak_memory_bytes'] / 2 ** 20:.1f} MiB vs "
+                    f"{base['peak_memory_bytes'] / 2 ** 20:.1f} MiB (x{ratio:.2f})"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the core stages on synthetic HR datasets.")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"comma separated row counts (default: {DEFAULT_SIZES})")
+    parser.add_argument("--stages", default=",".join(STAGES), help="comma separated stages (default: all)")
+    parser.add_argument("--model", default=RECOMMENDED_MODEL, help="model used by the predict and explain stages")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (default: 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=DEFAULT_RESULTS, help="results file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed relative regression (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--ci", action="store_true", help="fail when there is no baseline to compare against")
+    parser.add_argument("--list", action="store_true", help="list the stages and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, (_, _, description) in STAGES.items():
+            print(f"{name:>18}  {description}")
+        return 0
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+
+    report = {
+        "environment": environment(args.model),
+        "results": run_benchmarks(sizes, stages, args.model, args.repeat, args.seed)
+    }
+    args.output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2))
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.is_file():
+        if args.ci:
+            print(f"No baseline at {args.baseline}: record one with --save-baseline", file=sys.stderr)
+            return 2
+        print(f"No baseline at {args.baseline}, nothing to compare against")
+        return 0
+
+    regressions = compare(report["results"], json.loads(args.baseline.read_text()), args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} regression(s) against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"No regression against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
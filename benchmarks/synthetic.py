@@ -0,0 +1,91 @@
+"""Synthetic datasets shaped like the IBM HR attrition data.
+
+Columns, value ranges and types follow the IBM HR Analytics Employee
+Attrition dataset, so every page and core stage accepts them. Values are
+drawn independently from a seeded generator: the data is reproducible but
+carries no real signal.
+
+Usage:
+    python benchmarks/synthetic.py 1000000 hr_1m.csv [--seed 0]
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+DEPARTMENTS = ["Sales", "Research & Development", "Human Resources"]
+JOB_ROLES = [
+    "Sales Executive", "Research Scientist", "Laboratory Technician", "Manufacturing Director",
+    "Healthcare Representative", "Manager", "Sales Representative", "Research Director", "Human Resources"
+]
+EDUCATION_FIELDS = ["Life Sciences", "Medical", "Marketing", "Technical Degree", "Human Resources", "Other"]
+BUSINESS_TRAVEL = ["Travel_Rarely", "Travel_Frequently", "Non-Travel"]
+MARITAL_STATUS = ["Single", "Married", "Divorced"]
+
+
+def generate_hr_dataset(n_rows, seed=0):
+    """Return a DataFrame of ``n_rows`` synthetic employees."""
+    rng = np.random.default_rng(seed)
+
+    def scale(low=1, high=4):
+        return rng.integers(low, high + 1, n_rows, dtype=np.int64)
+
+    def choice(values, p=None):
+        return pd.Categorical.from_codes(rng.choice(len(values), n_rows, p=p), values).astype(object)
+
+    age = rng.integers(18, 61, n_rows)
+    years_at_company = np.minimum(rng.geometric(0.15, n_rows) - 1, age - 18)
+    total_working_years = years_at_company + rng.integers(0, 10, n_rows)
+    years_in_role = (years_at_company * rng.random(n_rows)).astype(np.int64)
+
+    return pd.DataFrame({
+        "Age": age,
+        "Attrition": choice(["No", "Yes"], p=[0.84, 0.16]),
+        "BusinessTravel": choice(BUSINESS_TRAVEL, p=[0.71, 0.19, 0.10]),
+        "DailyRate": rng.integers(102, 1500, n_rows),
+        "Department": choice(DEPARTMENTS, p=[0.30, 0.65, 0.05]),
+        "DistanceFromHome": rng.integers(1, 30, n_rows),
+        "Education": scale(1, 5),
+        "EducationField": choice(EDUCATION_FIELDS),
+        "EmployeeCount": np.ones(n_rows, dtype=np.int64),
+        "EmployeeNumber": np.arange(1, n_rows + 1),
+        "EnvironmentSatisfaction": scale(),
+        "Gender": choice(["Female", "Male"], p=[0.4, 0.6]),
+        "HourlyRate": rng.integers(30, 101, n_rows),
+        "JobInvolvement": scale(),
+        "JobLevel": scale(1, 5),
+        "JobRole": choice(JOB_ROLES),
+        "JobSatisfaction": scale(),
+        "MaritalStatus": choice(MARITAL_STATUS, p=[0.32, 0.46, 0.22]),
+        "MonthlyIncome": np.round(rng.lognormal(8.5, 0.6, n_rows)).clip(1009, 19999).astype(np.int64),
+        "MonthlyRate": rng.integers(2094, 27000, n_rows),
+        "NumCompaniesWorked": rng.integers(0, 10, n_rows),
+        "Over18": np.full(n_rows, "Y", dtype=object),
+        "OverTime": choice(["No", "Yes"], p=[0.72, 0.28]),
+        "PercentSalaryHike": rng.integers(11, 26, n_rows),
+        "PerformanceRating": scale(3, 4),
+        "RelationshipSatisfaction": scale(),
+        "StandardHours": np.full(n_rows, 80, dtype=np.int64),
+        "StockOptionLevel": scale(0, 3),
+        "TotalWorkingYears": total_working_years,
+        "TrainingTimesLastYear": scale(0, 6),
+        "WorkLifeBalance": scale(),
+        "YearsAtCompany": years_at_company,
+        "YearsInCurrentRole": years_in_role,
+        "YearsSinceLastPromotion": (years_at_company * rng.random(n_rows)).astype(np.int64),
+        "YearsWithCurrManager": (years_in_role * rng.random(n_rows)).astype(np.int64)
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic IBM HR shaped dataset to a CSV file.")
+    parser.add_argument("rows", type=int, help="number of employees")
+    parser.add_argument("output", help="path of the CSV file to write")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    generate_hr_dataset(args.rows, args.seed).to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Summarise the JSONL performance traces written by the app.
+
+Start the app with ``ATTRITION_PERF=1`` to record a trace line per rerun,
+then print the per-page, per-stage timing statistics:
+
+Usage:
+    python benchmarks/trace_report.py [.cache/perf/traces.jsonl] [--csv summary.csv]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "app"))
+
+from core.perf import aggregate_traces, trace_path  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise the app's performance traces.")
+    parser.add_argument("trace", nargs="?", type=Path, default=None,
+                        help=f"trace file (default: {trace_path()})")
+    parser.add_argument("--csv", type=Path, help="also write the summary to this CSV file")
+    args = parser.parse_args()
+
+    path = args.trace or trace_path()
+    if not path.is_file():
+        print(f"No trace file at {path}", file=sys.stderr)
+        return 1
+
+    summary = aggregate_traces(path)
+    print(summary.to_string(index=False, float_format=lambda value: f"{value:.2f}"))
+    if args.csv:
+        summary.to_csv(args.csv, index=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
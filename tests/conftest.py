@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The app modules are imported as ``core.*``, with ``app`` on the path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.partitioned_conflicts import partitioned_conflict_summary, read_summary, save_summary
+from core.soft_set import (
+    MAPPING_RULES, available_rules, compute_stat_values, conflict_summary_from_counts, map_soft_set, opinion_counts
+)
+
+
+def hr_partition(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Age': rng.integers(18, 61, n_rows).astype(float),
+        'Attrition': rng.choice(['No', 'Yes'], n_rows, p=[0.84, 0.16]),
+        'JobSatisfaction': rng.integers(1, 5, n_rows),
+        # Continuous, so that large partitions switch to t-digest sketches
+        'MonthlyIncome': rng.lognormal(8.5, 0.6, n_rows),
+        'OverTime': rng.choice(['No', 'Yes'], n_rows, p=[0.72, 0.28]),
+        'YearsAtCompany': rng.geometric(0.15, n_rows) - 1
+    })
+
+
+def write_partition(data, path):
+    if path.suffix == ".parquet":
+        data.to_parquet(path, index=False)
+    else:
+        data.to_csv(path, index=False)
+
+
+def in_memory_summary(data, stat_values):
+    rules = available_rules(data.columns, MAPPING_RULES)
+    return conflict_summary_from_counts(list(rules), opinion_counts(map_soft_set(data, rules, stat_values)))
+
+
+def test_matches_the_in_memory_summary(tmp_path):
+    partitions = [hr_partition(n, seed).drop(columns='MonthlyIncome') for seed, n in enumerate([3_000, 5_000, 2_000])]
+    for i, partition in enumerate(partitions):
+        write_partition(partition, tmp_path / f"part_{i:02d}{'.csv' if i % 2 else '.parquet'}")
+    data = pd.concat(partitions, ignore_index=True)
+
+    summary, stat_values = partitioned_conflict_summary(tmp_path, max_workers=2, chunk_rows=1_500)
+
+    rules = available_rules(data.columns, MAPPING_RULES)
+    assert stat_values == compute_stat_values(data, rules)
+    pd.testing.assert_frame_equal(summary, in_memory_summary(data, stat_values))
+
+
+def test_empty_partition_before_digest_partitions(tmp_path):
+    # The first partition has no value at all in two 'balanced' columns,
+    # later ones are large enough for histogram and t-digest sketches
+    empty = hr_partition(1_000, 0).assign(Age=np.nan, MonthlyIncome=np.nan)
+    partitions = [empty, hr_partition(150_000, 1), hr_partition(80_000, 2)]
+    for i, partition in enumerate(partitions):
+        write_partition(partition, tmp_path / f"part_{i:02d}{'.csv' if i == 0 else '.parquet'}")
+    data = pd.concat(partitions, ignore_index=True)
+
+    summary, stat_values = partitioned_conflict_summary(tmp_path, max_workers=2)
+
+    pd.testing.assert_frame_equal(summary, in_memory_summary(data, stat_values))
+    exact = compute_stat_values(data, available_rules(data.columns, MAPPING_RULES))
+    for attr in ('Age', 'YearsAtCompany'):
+        assert stat_values[attr] == exact[attr]
+    income = np.sort(data['MonthlyIncome'].dropna().to_numpy())
+    for name, q in (('low_threshold', 0.4), ('high_threshold', 0.6)):
+        rank = np.searchsorted(income, stat_values['MonthlyIncome'][name]) / len(income)
+        assert rank == pytest.approx(q, abs=0.01)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_summary_round_trip(tmp_path, suffix):
+    data = hr_partition(2_000, 3)
+    rules = available_rules(data.columns, MAPPING_RULES)
+    summary = in_memory_summary(data, compute_stat_values(data, rules))
+    path = tmp_path / f"summary{suffix}"
+    save_summary(summary, path)
+    pd.testing.assert_frame_equal(read_summary(path), summary)
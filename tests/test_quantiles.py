@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.quantiles import QuantileSketch, merge_sketches, sketch_columns
+from core.soft_set import BALANCED_HIGH_QUANTILE, BALANCED_LOW_QUANTILE, MAPPING_RULES, compute_stat_values
+
+QUANTILES = [0.0, 0.1, BALANCED_LOW_QUANTILE, 0.5, BALANCED_HIGH_QUANTILE, 0.9, 1.0]
+
+
+def chunked_sketch(values, n_chunks, **kwargs):
+    # Every chunk in its own sketch, as per partition, merged at the end
+    sketches = [QuantileSketch(**kwargs).update(chunk) for chunk in np.array_split(values, n_chunks)]
+    return merge_sketches({"column": sketch} for sketch in sketches)["column"]
+
+
+def rank_error(values, estimate, q):
+    # Distance between q and the range of ranks of ``estimate`` in ``values``
+    values = np.sort(values)
+    low = np.searchsorted(values, estimate, side="left") / len(values)
+    high = np.searchsorted(values, estimate, side="right") / len(values)
+    return max(low - q, q - high, 0.0)
+
+
+def test_exact_mode_matches_pandas():
+    values = np.random.default_rng(0).normal(50, 10, 10_000)
+    sketch = QuantileSketch().update(values)
+    assert sketch.is_exact and not sketch.is_histogram
+    np.testing.assert_allclose(sketch.quantile(QUANTILES), pd.Series(values).quantile(QUANTILES), rtol=0, atol=1e-12)
+    assert sketch.quantile(0.4) == pytest.approx(pd.Series(values).quantile(0.4), abs=1e-12)
+
+
+def test_nans_are_ignored():
+    sketch = QuantileSketch().update([1.0, np.nan, 3.0, 2.0])
+    assert sketch.count == 3
+    assert sketch.quantile(0.5) == 2.0
+
+
+def test_empty_sketch_returns_nan():
+    assert np.isnan(QuantileSketch().quantile(0.5))
+    assert np.isnan(QuantileSketch().quantile([0.4, 0.6])).all()
+
+
+@pytest.mark.parametrize("n_chunks", [1, 7, 40])
+def test_integer_columns_stay_exact_beyond_the_exact_limit(n_chunks):
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.integers(18, 61, 150_000), rng.integers(18, 25, 50_000)])
+    rng.shuffle(values)
+    sketch = chunked_sketch(values, n_chunks, exact_limit=10_000)
+    assert sketch.is_histogram
+    np.testing.assert_allclose(sketch.quantile(QUANTILES), pd.Series(values).quantile(QUANTILES), rtol=0, atol=1e-9)
+
+
+def test_integer_thresholds_are_exact_on_large_datasets():
+    rng = np.random.default_rng(2)
+    n = 250_000
+    data = pd.DataFrame({
+        'Age': rng.integers(18, 61, n),
+        'MonthlyIncome': rng.integers(1_000, 20_000, n),
+        'YearsAtCompany': rng.poisson(7, n)
+    })
+    chunks = [data.iloc[start:start + 30_000] for start in range(0, n, 30_000)]
+    sketches = sketch_columns(chunks, list(data.columns))
+    # The strict comparisons of the 'balanced' rule need the exact thresholds
+    assert compute_stat_values(None, MAPPING_RULES, sketches) == compute_stat_values(data, MAPPING_RULES)
+
+
+@pytest.mark.parametrize("distribution", ["normal", "lognormal", "uniform"])
+def test_digest_rank_error_stays_within_tolerance(distribution):
+    rng = np.random.default_rng(3)
+    n = 400_000
+    values = {
+        "normal": lambda: rng.normal(0, 1, n),
+        "lognormal": lambda: rng.lognormal(8, 0.5, n),
+        "uniform": lambda: rng.uniform(0, 100, n)
+    }[distribution]()
+    sketch = chunked_sketch(values, 13)
+    assert not sketch.is_exact
+    # About pi / compression in the middle of the distribution
+    tolerance = 2 * np.pi / sketch.compression
+    for q in (BALANCED_LOW_QUANTILE, BALANCED_HIGH_QUANTILE):
+        assert rank_error(values, sketch.quantile(q), q) <= tolerance
+
+
+def test_merging_raw_histogram_and_digest_sketches():
+    rng = np.random.default_rng(4)
+    raw = rng.normal(0, 1, 1_000)
+    histogram = rng.integers(0, 10, 200_000).astype(float)
+    digest = rng.normal(0, 1, 200_000)
+    values = np.concatenate([raw, histogram, digest])
+
+    merged = QuantileSketch().update(raw)
+    merged.merge(QuantileSketch().update(histogram)).merge(QuantileSketch().update(digest))
+    assert not merged.is_exact
+    assert merged.count == len(values)
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    for q in (BALANCED_LOW_QUANTILE, BALANCED_HIGH_QUANTILE):
+        assert rank_error(values, merged.quantile(q), q) <= 2 * np.pi / merged.compression
+
+
+@pytest.mark.parametrize("values", [
+    np.arange(1_000, dtype=float),
+    np.random.default_rng(5).integers(0, 100, 150_000),
+    np.random.default_rng(6).normal(0, 1, 150_000)
+], ids=["raw", "histogram", "digest"])
+def test_serialisation_round_trip(values, tmp_path):
+    sketch = QuantileSketch().update(values)
+    restored = QuantileSketch.from_bytes(sketch.to_bytes())
+    assert (restored.is_exact, restored.is_histogram) == (sketch.is_exact, sketch.is_histogram)
+    assert (restored.count, restored.min, restored.max) == (sketch.count, sketch.min, sketch.max)
+    np.testing.assert_array_equal(restored.quantile(QUANTILES), sketch.quantile(QUANTILES))
+
+    path = tmp_path / "column.sketch"
+    sketch.save(path)
+    np.testing.assert_array_equal(QuantileSketch.load(path).quantile(QUANTILES), sketch.quantile(QUANTILES))
+
+    # A restored sketch keeps accepting values
+    restored.update(values)
+    assert restored.count == 2 * len(values)
+
+
+SKETCH_VALUES = {
+    "raw": lambda: np.arange(1_000, dtype=float),
+    "histogram": lambda: np.random.default_rng(7).integers(0, 100, 150_000),
+    "digest": lambda: np.random.default_rng(8).normal(0, 1, 150_000)
+}
+
+
+@pytest.mark.parametrize("mode", list(SKETCH_VALUES))
+@pytest.mark.parametrize("empty_first", [True, False], ids=["into_empty", "empty_into"])
+def test_merging_with_an_empty_sketch(mode, empty_first):
+    values = SKETCH_VALUES[mode]()
+    expected = QuantileSketch().update(values)
+    # Empty sketches also come from all-NaN columns
+    empty = QuantileSketch().update([np.nan, np.nan])
+    if empty_first:
+        merged = empty.merge(QuantileSketch().update(values))
+    else:
+        merged = QuantileSketch().update(values).merge(empty)
+
+    assert (merged.is_exact, merged.is_histogram) == (expected.is_exact, expected.is_histogram)
+    assert (merged.count, merged.min, merged.max) == (expected.count, expected.min, expected.max)
+    np.testing.assert_allclose(merged.quantile(QUANTILES), expected.quantile(QUANTILES), rtol=0, atol=1e-9)
@@ -0,0 +1,66 @@
+import http.client
+import json
+import socket
+import threading
+
+import numpy as np
+import pytest
+
+from core.features import FEATURE_COLUMNS
+from core.micro_batching import MicroBatcher
+from scoring_service import ScoringRequestHandler, ScoringServer
+
+EMPLOYEE = {column: 3 for column in FEATURE_COLUMNS} | {"OverTime": "Yes", "EmployeeNumber": 7}
+
+
+def score_batch(matrix):
+    # Stands in for the model: the probability is the first feature over 10
+    return [{"Predicted_Attrition": "No", "Probability": float(row[0]) / 10} for row in np.asarray(matrix)]
+
+
+@pytest.fixture
+def server():
+    server = ScoringServer(("127.0.0.1", 0), ScoringRequestHandler)
+    server.model_name = "test"
+    server.verbose = False
+    server.batcher = MicroBatcher(score_batch, max_batch_size=8, max_wait=0.001)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.batcher.close()
+
+
+def raw_post(server, content_length, body=b""):
+    # http.client would fix the header up, so the request is written by hand
+    with socket.create_connection(server.server_address, timeout=5) as connection:
+        connection.sendall(
+            b"POST /predict HTTP/1.1\r\nHost: test\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {content_length}\r\n\r\n".encode() + body
+        )
+        response = http.client.HTTPResponse(connection)
+        response.begin()
+        return response.status, json.loads(response.read())
+
+
+def test_predict(server):
+    connection = http.client.HTTPConnection(*server.server_address, timeout=5)
+    connection.request("POST", "/predict", json.dumps(EMPLOYEE), {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    assert response.status == 200
+    assert json.loads(response.read()) == {"EmployeeNumber": 7, "Predicted_Attrition": "No", "Probability": 0.3}
+    connection.close()
+
+
+@pytest.mark.parametrize("content_length", ["-1", "abc", "1.5", "+10", "1_0", "²"])
+def test_invalid_content_length_is_rejected_without_reading(server, content_length):
+    # The body is never sent: a handler waiting for it would time out
+    status, payload = raw_post(server, content_length)
+    assert status == 400
+    assert "Content-Length" in payload["error"]
+
+
+def test_body_too_large_is_rejected(server):
+    status, _ = raw_post(server, 2 << 20)
+    assert status == 413